@@ -1,8 +1,10 @@
 import asyncio
 import asyncpg
 import logging
+import re
+import time
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 from cachetools import TTLCache
 import os
 from dotenv import load_dotenv
@@ -13,6 +15,20 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# TRON主网地址格式（T开头，共34位Base58字符）
+_TRON_ADDR_RE = re.compile(r'T[1-9A-HJ-NP-Za-km-z]{33}')
+
+_UPSERT_BLACKLIST_SQL = '''
+    INSERT INTO blacklist (address, reason, type, added_by, is_provisional)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (address) 
+    DO UPDATE SET 
+        reason = COALESCE(EXCLUDED.reason, blacklist.reason),
+        is_active = true,
+        added_at = NOW(),
+        is_provisional = EXCLUDED.is_provisional
+'''
+
 class BlacklistManager:
     def __init__(self):
         """初始化黑名单管理器"""
@@ -24,29 +40,55 @@ class BlacklistManager:
         self._blacklist_cache = TTLCache(maxsize=1000, ttl=300)
         self._connection_pool = None
         self._settings_manager: Optional[SettingsManager] = None
+        self._init_lock = asyncio.Lock()
+        self._ready = False
+        # 全部有效黑名单地址的内存索引：未命中的地址无需查询数据库
+        # 每5分钟从数据库重新加载一次，与缓存TTL一致，以同步其他进程的修改
+        self._address_index: Optional[Set[str]] = None
+        self._address_index_loaded_at = 0.0
+        self._address_index_ttl = 300
+        # 重新加载只由一个协程执行；加载期间的增删记录在 pending 中，加载完成后重放到新集合
+        self._address_index_lock = asyncio.Lock()
+        self._address_index_pending: Optional[List[Tuple[bool, str]]] = None
+
+    async def ensure_ready(self):
+        """确保数据库已初始化（幂等，并发调用时只初始化一次）"""
+        if self._ready:
+            return
+        async with self._init_lock:
+            if not self._ready:
+                await self.init_database()
         
     async def init_database(self):
         """初始化数据库连接池和表结构"""
         try:
-            # 创建连接池
-            self._connection_pool = await asyncpg.create_pool(
+            # 创建连接池：保持少量常驻连接，空闲连接5分钟后回收
+            # asyncpg 会按连接缓存预处理语句，热点查询无需手动 prepare
+            pool = await asyncpg.create_pool(
                 self.database_url,
-                min_size=1,
-                max_size=10,
+                min_size=2,
+                max_size=20,
+                max_inactive_connection_lifetime=300,
                 command_timeout=30
             )
             
-            # 创建表结构
-            await self._create_tables()
+            # 创建表结构；失败时关闭本次创建的连接池，避免下次重试时遗留旧连接池
+            try:
+                await self._create_tables(pool)
+            except Exception:
+                await pool.close()
+                raise
+            self._connection_pool = pool
+            self._ready = True
             logger.info("数据库初始化成功")
             
         except Exception as e:
             logger.error(f"数据库初始化失败: {e}")
             raise
             
-    async def _create_tables(self):
+    async def _create_tables(self, pool: asyncpg.pool.Pool):
         """创建数据库表结构"""
-        async with self._connection_pool.acquire() as connection:
+        async with pool.acquire() as connection:
             # 创建黑名单表
             await connection.execute('''
                 CREATE TABLE IF NOT EXISTS blacklist (
@@ -94,23 +136,16 @@ class BlacklistManager:
                 return False
                 
             # 确保数据库连接池已初始化
-            if self._connection_pool is None:
-                await self.init_database()
+            await self.ensure_ready()
                 
             async with self._connection_pool.acquire() as connection:
-                await connection.execute('''
-                    INSERT INTO blacklist (address, reason, type, added_by, is_provisional)
-                    VALUES ($1, $2, $3, $4, $5)
-                    ON CONFLICT (address) 
-                    DO UPDATE SET 
-                        reason = COALESCE(EXCLUDED.reason, blacklist.reason),
-                        is_active = true,
-                        added_at = NOW(),
-                        is_provisional = EXCLUDED.is_provisional
-                ''', address, reason, addr_type, added_by, is_provisional)
+                await connection.execute(
+                    _UPSERT_BLACKLIST_SQL, address, reason, addr_type, added_by, is_provisional
+                )
                 
             # 清除缓存
             self._blacklist_cache.pop(address, None)
+            self._update_address_index((address,), True)
             
             logger.info(f"成功添加地址到黑名单: {address}")
             return True
@@ -119,6 +154,37 @@ class BlacklistManager:
             logger.error(f"添加黑名单失败: {e}")
             return False
             
+    async def record_fail_vote(self, payment_address: str, provider_address: str,
+                               added_by: int = None) -> bool:
+        """记录“未获得能量”反馈：收款地址与能量提供方在同一事务中加入临时黑名单"""
+        try:
+            addresses = list(dict.fromkeys((payment_address, provider_address)))
+            if not all(self._validate_tron_address(address) for address in addresses):
+                return False
+                
+            # 确保数据库连接池已初始化
+            await self.ensure_ready()
+            
+            reason = f'用户{added_by}反馈未成功'
+            async with self._connection_pool.acquire() as connection:
+                async with connection.transaction():
+                    await connection.executemany(
+                        _UPSERT_BLACKLIST_SQL,
+                        [(address, reason, 'manual', added_by, True) for address in addresses]
+                    )
+                    
+            # 清除缓存
+            for address in addresses:
+                self._blacklist_cache.pop(address, None)
+            self._update_address_index(addresses, True)
+                
+            logger.info(f"用户反馈未成功，已加入黑名单: {payment_address}, {provider_address}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"记录未成功反馈失败: {e}")
+            return False
+            
     async def check_blacklist(self, address: str) -> Optional[Dict]:
         """检查地址是否在黑名单中"""
         try:
@@ -131,8 +197,7 @@ class BlacklistManager:
                 return None
                 
             # 确保数据库连接池已初始化
-            if self._connection_pool is None:
-                await self.init_database()
+            await self.ensure_ready()
                 
             async with self._connection_pool.acquire() as connection:
                 result = await connection.fetchrow('''
@@ -163,12 +228,93 @@ class BlacklistManager:
             logger.error(f"检查黑名单失败: {e}")
             return None
             
+    def _address_index_fresh(self) -> bool:
+        return (self._address_index is not None
+                and time.monotonic() - self._address_index_loaded_at <= self._address_index_ttl)
+
+    def _update_address_index(self, addresses: Iterable[str], active: bool) -> None:
+        """写入提交后同步内存索引；重新加载进行中时同时记录变更，避免被加载前的快照覆盖"""
+        addresses = tuple(addresses)
+        if self._address_index_pending is not None:
+            self._address_index_pending.extend((active, address) for address in addresses)
+        if self._address_index is not None:
+            if active:
+                self._address_index.update(addresses)
+            else:
+                self._address_index.difference_update(addresses)
+
+    async def _get_address_index(self) -> Set[str]:
+        """获取有效黑名单地址集合，过期时从数据库重新加载（并发调用只加载一次）"""
+        if self._address_index_fresh():
+            return self._address_index
+        async with self._address_index_lock:
+            if self._address_index_fresh():
+                return self._address_index
+            await self.ensure_ready()
+            self._address_index_pending = []
+            try:
+                async with self._connection_pool.acquire() as connection:
+                    rows = await connection.fetch('SELECT address FROM blacklist WHERE is_active = true')
+                index = {row['address'] for row in rows}
+                # 重放加载期间提交的增删，查询快照中可能还没有这些变更
+                for active, address in self._address_index_pending:
+                    if active:
+                        index.add(address)
+                    else:
+                        index.discard(address)
+            finally:
+                self._address_index_pending = None
+            self._address_index = index
+            self._address_index_loaded_at = time.monotonic()
+        return self._address_index
+
+    async def check_blacklist_many(self, addresses: List[str]) -> Dict[str, Dict]:
+        """批量检查地址是否在黑名单中，返回 {地址: 黑名单信息}（仅包含命中的地址）"""
+        results: Dict[str, Dict] = {}
+        try:
+            # 先查缓存，未命中的合法地址再一次性查询数据库
+            missing = []
+            for address in addresses:
+                if address in self._blacklist_cache:
+                    if self._blacklist_cache[address]:
+                        results[address] = self._blacklist_cache[address]
+                elif self._validate_tron_address(address):
+                    missing.append(address)
+            if not missing:
+                return results
+
+            # 不在黑名单索引中的地址直接记为未命中，只为可能命中的地址查询详情
+            index = await self._get_address_index()
+            for address in missing:
+                if address not in index:
+                    self._blacklist_cache[address] = None
+            missing = [address for address in missing if address in index]
+            if not missing:
+                return results
+
+            async with self._connection_pool.acquire() as connection:
+                rows = await connection.fetch('''
+                    SELECT address, reason, type, added_by, added_at, is_active, is_provisional
+                    FROM blacklist 
+                    WHERE address = ANY($1::varchar[]) AND is_active = true
+                ''', missing)
+
+            for row in rows:
+                results[row['address']] = dict(row)
+            # 缓存结果（包括空结果）
+            for address in missing:
+                self._blacklist_cache[address] = results.get(address)
+            return results
+
+        except Exception as e:
+            logger.error(f"批量检查黑名单失败: {e}")
+            return results
+            
     async def remove_from_blacklist(self, address: str) -> bool:
         """从黑名单中移除地址"""
         try:
             # 确保数据库连接池已初始化
-            if self._connection_pool is None:
-                await self.init_database()
+            await self.ensure_ready()
                 
             async with self._connection_pool.acquire() as connection:
                 result = await connection.execute('''
@@ -179,6 +325,7 @@ class BlacklistManager:
                 
             # 清除缓存
             self._blacklist_cache.pop(address, None)
+            self._update_address_index((address,), False)
             
             logger.info(f"成功移除黑名单地址: {address}")
             return True
@@ -191,8 +338,7 @@ class BlacklistManager:
         """添加地址关联记录"""
         try:
             # 确保数据库连接池已初始化
-            if self._connection_pool is None:
-                await self.init_database()
+            await self.ensure_ready()
                 
             async with self._connection_pool.acquire() as connection:
                 await connection.execute('''
@@ -257,8 +403,7 @@ class BlacklistManager:
         """获取黑名单统计信息"""
         try:
             # 确保数据库连接池已初始化
-            if self._connection_pool is None:
-                await self.init_database()
+            await self.ensure_ready()
                 
             async with self._connection_pool.acquire() as connection:
                 result = await connection.fetchrow('''
@@ -280,19 +425,10 @@ class BlacklistManager:
             logger.error(f"获取统计信息失败: {e}")
             return {}
             
-    def _validate_tron_address(self, address: str) -> bool:
+    @staticmethod
+    def _validate_tron_address(address: str) -> bool:
         """验证TRON地址格式"""
-        if not address:
-            return False
-            
-        # TRON主网地址格式验证（T开头，34位）
-        if address.startswith('T') and len(address) == 34:
-            # 简单的字符验证
-            import re
-            pattern = r'^T[1-9A-HJ-NP-Za-km-z]{33}$'
-            return bool(re.match(pattern, address))
-            
-        return False
+        return bool(address) and _TRON_ADDR_RE.fullmatch(address) is not None
         
     async def close(self):
         """关闭数据库连接池"""
@@ -0,0 +1,117 @@
+import asyncio
+import asyncpg
+import logging
+import os
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackPayloadManager:
+    """按钮回调负载管理器
+
+    持久化 callback_data 中负载键对应的（收款地址, 能量提供方），
+    使机器人重启后旧消息的按钮在有效期内仍可使用。
+    """
+
+    def __init__(self, ttl_seconds: int = 604800) -> None:
+        load_dotenv()
+        self.database_url = os.getenv("DATABASE_URL")
+        if not self.database_url:
+            raise ValueError("请在.env文件中设置DATABASE_URL")
+        self.ttl_seconds = ttl_seconds
+        self._connection_pool: Optional[asyncpg.pool.Pool] = None
+        self._init_lock = asyncio.Lock()
+        self._ready = False
+
+    async def ensure_ready(self) -> None:
+        """确保数据库已初始化（幂等，并发调用时只初始化一次）"""
+        if self._ready:
+            return
+        async with self._init_lock:
+            if not self._ready:
+                await self.init_database()
+
+    async def init_database(self) -> None:
+        """初始化连接池和表结构"""
+        pool = await asyncpg.create_pool(
+            self.database_url,
+            min_size=1,
+            max_size=5,
+            command_timeout=30,
+        )
+        # 建表失败时关闭本次创建的连接池，避免下次重试时遗留旧连接池
+        try:
+            await self._create_tables(pool)
+        except Exception:
+            await pool.close()
+            raise
+        self._connection_pool = pool
+        self._ready = True
+
+    async def _create_tables(self, pool: asyncpg.pool.Pool) -> None:
+        async with pool.acquire() as conn:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS callback_payloads (
+                    key VARCHAR(16) PRIMARY KEY,
+                    payment_address VARCHAR(50) NOT NULL,
+                    provider_address VARCHAR(50) NOT NULL,
+                    expires_at TIMESTAMP NOT NULL
+                )
+                """
+            )
+            await conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_callback_payloads_expires ON callback_payloads(expires_at)"
+            )
+
+    async def save(self, key: str, payment_address: str, provider_address: str) -> None:
+        await self.ensure_ready()
+        async with self._connection_pool.acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO callback_payloads (key, payment_address, provider_address, expires_at)
+                VALUES ($1, $2, $3, NOW() + make_interval(secs => $4))
+                ON CONFLICT (key)
+                DO UPDATE SET
+                    payment_address = EXCLUDED.payment_address,
+                    provider_address = EXCLUDED.provider_address,
+                    expires_at = EXCLUDED.expires_at
+                """,
+                key,
+                payment_address,
+                provider_address,
+                float(self.ttl_seconds),
+            )
+
+    async def get(self, key: str) -> Optional[Tuple[str, str]]:
+        await self.ensure_ready()
+        async with self._connection_pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT payment_address, provider_address
+                FROM callback_payloads
+                WHERE key = $1 AND expires_at > NOW()
+                """,
+                key,
+            )
+            if row:
+                return (row["payment_address"], row["provider_address"])
+            return None
+
+    async def prune_expired(self) -> int:
+        """删除已过期的负载，返回删除的条数"""
+        await self.ensure_ready()
+        async with self._connection_pool.acquire() as conn:
+            result = await conn.execute(
+                "DELETE FROM callback_payloads WHERE expires_at <= NOW()"
+            )
+        # asyncpg 返回形如 "DELETE 12" 的状态字符串
+        return int(result.split()[-1]) if result else 0
+
+    async def close(self) -> None:
+        if self._connection_pool:
+            await self._connection_pool.close()
+            logger.info("回调负载连接池已关闭")
@@ -1,8 +1,10 @@
 import os
 import logging
-from datetime import datetime
-from typing import Optional, List, Dict, Set
+from datetime import datetime, timezone, timedelta
+from typing import Optional, List, Dict, Set, Tuple
 import asyncio
+import itertools
+import string
 import time
 import re
 
@@ -13,9 +15,11 @@ from telegram.ext import (
     ContextTypes,
     MessageHandler,
     CallbackQueryHandler,
+    AIORateLimiter,
     filters,
 )
 from telegram.error import TelegramError
+from telegram.request import HTTPXRequest
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dotenv import load_dotenv
 from functools import lru_cache
@@ -25,6 +29,22 @@ from tron_energy_finder import TronEnergyFinder
 from blacklist_manager import BlacklistManager
 from whitelist_manager import WhitelistManager
 from settings_manager import SettingsManager
+from callback_payload_manager import CallbackPayloadManager
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+except ImportError:
+    h2 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # 配置日志
 logging.basicConfig(
@@ -36,6 +56,240 @@ logger = logging.getLogger(__name__)
 # 设置httpx日志级别为WARNING，避免显示敏感URL
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
+# TRON地址检测正则表达式
+# 固定长度字符类、无嵌套量词，标准库 re 的扫描已是线性的；
+# 注意 \b 在 str 模式下按 Unicode 判断单词边界（紧贴中文的地址不会匹配），替换引擎需保持该语义
+TRON_ADDRESS_PATTERN = re.compile(r'\b(T[1-9A-HJ-NP-Za-km-z]{33})\b')
+
+# 推送消息中的收款地址/能量提供方行（message.text 不含 Markdown 标记，反引号可有可无）
+PAYMENT_LINE_PATTERN = re.compile(r'【收款地址】[:：]?\s*`?(T[1-9A-HJ-NP-Za-km-z]{33})')
+PROVIDER_LINE_PATTERN = re.compile(r'【能量提供方】[:：]?\s*`?(T[1-9A-HJ-NP-Za-km-z]{33})')
+
+# Markdown 转义表：旧版 Markdown 仅以下字符需要转义，其它字符加反斜杠会原样显示
+MARKDOWN_ESCAPE_TABLE = str.maketrans({char: f'\\{char}' for char in '_*`['})
+
+# 定时推送遇到 RetryAfter 时的最大重试次数（交互消息使用限速器默认的1次）
+BROADCAST_MAX_RETRIES = 3
+
+# 消息按钮有效期（超过后不再处理回调）
+_EXPIRY_DELTA = timedelta(days=7)
+
+# 固定消息模板（模块加载时构建一次）
+WELCOME_MSG = (
+    "👋 欢迎使用Tron能量查找机器人！\n\n"
+    "🔍 使用 /query 命令立即查找低成本能量代理地址\n"
+    "ℹ️ 使用 /help 命令查看更多帮助信息"
+)
+
+HELP_MSG = (
+    "📖 机器人使用帮助：\n\n"
+    "1️⃣ 私聊命令：\n"
+    "   /query - 立即查找低成本能量代理地址\n"
+    "   /help - 显示此帮助信息\n\n"
+    "2️⃣ 频道/群组命令：\n"
+    "   /start_push - 开启定时推送（仅管理员）\n"
+    "   /stop_push - 关闭定时推送（仅管理员）\n"
+    "   /query - 立即查询一次\n"
+    "   /channels - 查看活跃频道列表（仅管理员）\n\n"
+    "3️⃣ 黑名单功能：\n"
+    "   /blacklist_add <地址> [原因] - 添加地址到黑名单\n"
+    "   /blacklist_check <地址> - 查询地址黑名单状态\n"
+    "   /blacklist_remove <地址> - 从黑名单移除地址（仅管理员）\n"
+    "   /blacklist_stats - 查看黑名单统计信息\n\n"
+    "4️⃣ 白名单功能：\n"
+    "   /whitelist_add <地址> <payment|provider> [原因] - 添加地址到白名单\n"
+    "   /whitelist_check <地址> <payment|provider> - 查询白名单状态\n"
+    "   /whitelist_remove <地址> <payment|provider> - 移除白名单（仅管理员）\n"
+    "   /whitelist_stats - 查看白名单统计信息\n\n"
+    "5️⃣ 管理员设置：\n"
+    "   /assoc on|off|status - 黑名单关联开关（仅管理员）\n"
+    "   /refresh - 清除查询结果缓存，下次查询重新扫描（仅管理员）\n\n"
+    "6️⃣ 地址检测：\n"
+    "   直接发送TRON地址自动检查黑名单状态\n\n"
+    "💡 注意事项：\n"
+    "   • 频道/群组中使用命令需要授予机器人管理员权限\n"
+    "   • 查询结果中会显示黑/白名单警告信息\n"
+    "   • 发现可疑地址请及时举报到黑名单"
+)
+
+BLACKLIST_WARNING_TEMPLATE = """🔍 **地址查询结果**
+
+📍 **地址**: `{address}`
+
+❌ **黑名单状态**: 已列入黑名单
+⚠️ **风险提醒**: 此地址已被用户举报，可能存在白名单限制
+📝 **举报原因**: {reason}
+⏰ **添加时间**: {added_time}
+🔖 **添加类型**: {type_label}
+
+💡 **建议**: 直接转TRX可能无法获得能量，请谨慎操作！
+
+如有疑问，请联系管理员。"""
+
+
+# 回调负载键使用 base62 编码
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+
+def to_base62(number: int) -> str:
+    """将非负整数编码为 base62 字符串"""
+    if number == 0:
+        return BASE62_ALPHABET[0]
+    chars = []
+    while number:
+        number, remainder = divmod(number, 62)
+        chars.append(BASE62_ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+def markdown_entities_balanced(text: str) -> bool:
+    """检查旧版 Markdown 文本中的实体是否都已闭合
+
+    支持 *粗体*、_斜体_、`代码`、```代码块``` 与 [文本](链接)，反斜杠转义的字符跳过；
+    未闭合时 Telegram 会拒绝整条消息（can't parse entities）。
+    """
+    i, n = 0, len(text)
+    while i < n:
+        char = text[i]
+        if char == '\\':
+            i += 2
+        elif text.startswith('```', i):
+            end = text.find('```', i + 3)
+            if end < 0:
+                return False
+            i = end + 3
+        elif char in '*_`':
+            end = text.find(char, i + 1)
+            if end < 0:
+                return False
+            i = end + 1
+        elif char == '[':
+            close = text.find(']', i + 1)
+            if close < 0 or not text.startswith('(', close + 1):
+                return False
+            end = text.find(')', close + 2)
+            if end < 0:
+                return False
+            i = end + 1
+        else:
+            i += 1
+    return True
+
+
+# 地址消息模板（静态部分一次定义，按地址信息填充）
+ADDRESS_MESSAGE_TEMPLATE = (
+    "🔹 【收款地址】: `{address}`\n"
+    "🔹 【能量提供方】: `{energy_provider}`\n"
+    "🔹 【购买记录】: [查看](https://tronscan.org/#/address/{address})\n"
+    "🔹 【收款金额】: {purchase_amount} TRX\n"
+    "🔹 【能量数量】: {energy_display}\n"
+    "🔹 【24h交易数】: {recent_tx_count} 笔\n"
+    "🔹 【转账哈希】: `{tx_hash}`\n"
+    "🔹 【代理哈希】: `{proxy_tx_hash}`\n\n"
+    "📊 状态分析：\n"
+    "{whitelist_status}"
+    "\n{blacklist_status}"
+    "\n🈹 TRX #{purchase_amount}\n"
+    "{footer}"
+)
+
+
+class _SafeDict(dict):
+    """format_map 使用的字典：缺失字段填充为空字符串"""
+
+    def __missing__(self, key):
+        return ''
+
+
+# 单方反馈操作：动作 -> (名单类型, 地址角色, 记录原因, 确认消息, 已记录按钮文案)
+SINGLE_FEEDBACK_ACTIONS = {
+    'only_pay_wl': ('whitelist', 'payment', '用户反馈：仅收款地址成功',
+                    '✅ 已记录：仅收款地址加入白名单（临时）。如需撤回，请联系管理员。', '✅ 收款地址已加白'),
+    'only_prov_wl': ('whitelist', 'provider', '用户反馈：仅提供方成功',
+                     '✅ 已记录：仅能量提供方加入白名单（临时）。如需撤回，请联系管理员。', '✅ 提供方已加白'),
+    'only_pay_bl': ('blacklist', 'payment', '用户反馈：仅收款地址有问题',
+                    '❌ 已记录：仅收款地址加入黑名单（临时）。如需撤回，请联系管理员。', '❌ 收款地址已加黑'),
+    'only_prov_bl': ('blacklist', 'provider', '用户反馈：仅提供方有问题',
+                     '❌ 已记录：仅能量提供方加入黑名单（临时）。如需撤回，请联系管理员。', '❌ 提供方已加黑'),
+}
+
+# 回调动作分组
+CONTINUE_PREFIX = 'continue_'
+CONFIRMABLE_ACTIONS = frozenset({'vote_success', 'vote_fail', 'more_ops'})  # 过期后需确认才执行
+RECORDED_ACTIONS = frozenset({'recorded_success', 'recorded_fail', 'recorded', 'expired_get_new'})
+
+# 投票按钮文案
+VOTE_SUCCESS_LABEL = '✅ 我已成功获得能量（两者加入白名单）'
+VOTE_FAIL_LABEL = '❌ 我未获得能量（两者加入黑名单）'
+MORE_OPS_LABEL = '▶️ 更多操作'
+
+
+@lru_cache(maxsize=256)
+def build_vote_keyboard(payload_key: str) -> InlineKeyboardMarkup:
+    """构建单条地址消息的投票按钮（同一负载键复用同一对象）"""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(text=VOTE_SUCCESS_LABEL, callback_data=f"vote_success:{payload_key}")],
+        [InlineKeyboardButton(text=VOTE_FAIL_LABEL, callback_data=f"vote_fail:{payload_key}")],
+        [InlineKeyboardButton(text=MORE_OPS_LABEL, callback_data=f"more_ops:{payload_key}")],
+    ])
+
+
+@lru_cache(maxsize=1024)
+def build_more_ops_keyboard(payload_key: str) -> InlineKeyboardMarkup:
+    """构建“更多操作”展开后的按钮"""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton('🧩 仅收款地址成功（加白）', callback_data=f'only_pay_wl:{payload_key}')],
+        [InlineKeyboardButton('🔋 仅提供方成功（加白）', callback_data=f'only_prov_wl:{payload_key}')],
+        [InlineKeyboardButton('🚩 仅收款地址有问题（加黑）', callback_data=f'only_pay_bl:{payload_key}')],
+        [InlineKeyboardButton('🧨 仅提供方有问题（加黑）', callback_data=f'only_prov_bl:{payload_key}')],
+        [InlineKeyboardButton('↩️ 撤回我的反馈', callback_data=f'revoke:{payload_key}')],
+        [InlineKeyboardButton('❌ 取消', callback_data=f'cancel:{payload_key}')],
+    ])
+
+
+@lru_cache(maxsize=1024)
+def build_recorded_vote_keyboard(result: str, payload_key: str) -> InlineKeyboardMarkup:
+    """构建投票已记录后的按钮，result 为 'success' 或 'fail'"""
+    label = "✅ 已记录为成功" if result == 'success' else "❌ 已记录为失败"
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton(label, callback_data=f"recorded_{result}"),
+        InlineKeyboardButton("撤回", callback_data=f"revoke_{result}:{payload_key}")
+    ]])
+
+
+@lru_cache(maxsize=1024)
+def build_continue_keyboard(action: str, payload_key: str) -> InlineKeyboardMarkup:
+    """构建过期消息的“仍要操作/取消”确认按钮"""
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("仍要操作", callback_data=f"{CONTINUE_PREFIX}{action}:{payload_key}"),
+        InlineKeyboardButton("取消", callback_data="cancel_expired")
+    ]])
+
+
+# 不含负载键的固定按钮，模块加载时构建一次
+EXPIRED_KEYBOARD = InlineKeyboardMarkup([[
+    InlineKeyboardButton("已过期（获取最新）", callback_data="expired_get_new")
+]])
+SINGLE_FEEDBACK_RECORDED_KEYBOARDS = {
+    action: InlineKeyboardMarkup([[InlineKeyboardButton(spec[4], callback_data="recorded")]])
+    for action, spec in SINGLE_FEEDBACK_ACTIONS.items()
+}
+
+
+class FastJsonHTTPXRequest(HTTPXRequest):
+    """解析 Telegram 响应时使用 orjson（未安装时与默认实现一致）"""
+
+    @staticmethod
+    def parse_json_payload(payload: bytes) -> Dict:
+        if orjson is not None:
+            try:
+                return orjson.loads(payload)
+            except orjson.JSONDecodeError:
+                # 非法 UTF-8 等情况交给默认实现（替换错误字符并记录日志）
+                pass
+        return HTTPXRequest.parse_json_payload(payload)
+
+
 class TronEnergyBot:
     def __init__(self):
         # 加载环境变量
@@ -54,6 +308,18 @@ class TronEnergyBot:
         self.advertisement = os.getenv("BOT_ADVERTISEMENT", "").strip()
         if self.advertisement:
             logger.info("成功加载广告内容")
+        
+        # 地址消息的固定结尾（按钮说明 + 广告），启动时构建一次
+        self._message_footer = "\n按钮说明：成功=两者加白；未成功=两者加黑；更多=展开单独添加/撤回"
+        if self.advertisement:
+            # 对于广告内容，这里先简单处理环境变量中的换行符
+            safe_ad = self.advertisement.replace('\\n', '\n')
+            # 广告按 Markdown 原样拼入每条地址消息，标记未闭合（如裸链接 t.me/foo_bar）会导致所有消息发送失败，
+            # 启动时校验一次，不合法时整体转义为纯文本显示
+            if not markdown_entities_balanced(safe_ad):
+                logger.warning("广告内容的 Markdown 标记未闭合，已转义为纯文本显示")
+                safe_ad = safe_ad.translate(MARKDOWN_ESCAPE_TABLE)
+            self._message_footer += f"\n\n{safe_ad}"
             
         # 初始化TronEnergyFinder
         self.finder = TronEnergyFinder()
@@ -64,62 +330,91 @@ class TronEnergyBot:
         self.whitelist_manager = WhitelistManager()
         # 设置管理器
         self.settings_manager = SettingsManager()
+        # 回调负载持久化管理器
+        self.callback_payload_manager = CallbackPayloadManager(ttl_seconds=604800)
         
         # 初始化调度器
         self.scheduler = AsyncIOScheduler()
         
         # 存储活跃的频道（启用了推送的频道）
         self.active_channels: Set[int] = set()
+        # 机器人被加入过的频道/超级群组（用于首次加入时推送一次）
+        self.subscribed_channels: Set[int] = set()
         
-        # 添加并发控制
-        self._query_lock = asyncio.Lock()
-        self._query_semaphore = asyncio.Semaphore(3)  # 最多同时处理3个查询
         self._user_cooldowns = TTLCache(maxsize=1000, ttl=60)  # 用户冷却时间缓存
         self._min_query_interval = 60  # 用户查询间隔（秒）
+        self._admin_cache = TTLCache(maxsize=1000, ttl=300)  # 管理员权限缓存 (chat_id, user_id) -> bool
+        self._chat_info_cache = TTLCache(maxsize=10000, ttl=3600)  # 频道信息缓存 chat_id -> Chat
+        
+        # 按聊天分片的发送队列：同一聊天内按顺序发送，不同聊天之间并发
+        self._chat_queues: Dict[int, asyncio.Queue] = {}
+        self._chat_workers: Dict[int, asyncio.Task] = {}
+        
+        # 定时推送自适应间隔：连续未找到地址时逐次加倍间隔以减少上游扫描，找到后恢复常规间隔
+        self._broadcast_interval = 3600  # 常规推送间隔（秒）
+        self._broadcast_max_interval = 6 * 3600  # 退避后的最长间隔（秒）
+        self._consecutive_empty = 0  # 连续未找到地址的次数
+        
+        # 进行中的地址查找任务：并发的查询/推送共享同一次查找
+        self._inflight_search: Optional[asyncio.Task] = None
         
         # TRON地址检测正则表达式
-        self.tron_address_pattern = re.compile(r'\b(T[1-9A-HJ-NP-Za-km-z]{33})\b')
+        self.tron_address_pattern = TRON_ADDRESS_PATTERN
         
-        # 回调负载缓存（避免超长callback_data）- 延长到7天
+        # 回调负载缓存（避免超长callback_data）- 延长到7天；作为数据库持久化前的一级缓存
         self._cb_payloads: TTLCache = TTLCache(maxsize=1000, ttl=604800)  # 7天 = 7*24*3600秒
+        # 后台写入任务（保留引用，避免任务被垃圾回收）
+        self._background_tasks: Set[asyncio.Task] = set()
+        # 负载键计数器：以启动时的毫秒时间戳为起点，重启后不会与旧消息的键重复
+        self._cb_counter = itertools.count(int(time.time() * 1000))
 
     def _store_cb_payload(self, payment: str, provider: str) -> str:
-        import uuid
-        key = uuid.uuid4().hex[:10]
+        key = to_base62(next(self._cb_counter))
         self._cb_payloads[key] = (payment, provider)
+        # 后台写入数据库，不阻塞消息发送
+        task = asyncio.get_running_loop().create_task(self._persist_cb_payload(key, payment, provider))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
         return key
 
-    def _get_cb_payload(self, key: str):
-        return self._cb_payloads.get(key)
+    async def _persist_cb_payload(self, key: str, payment: str, provider: str) -> None:
+        try:
+            await self.callback_payload_manager.save(key, payment, provider)
+        except Exception as e:
+            logger.warning(f"保存回调负载失败（仅保留内存缓存）: {e}")
+
+    async def _get_cb_payload(self, key: str):
+        payload = self._cb_payloads.get(key)
+        if payload is not None or not key:
+            return payload
+        # 内存中没有（例如机器人重启过），回退到数据库
+        try:
+            payload = await self.callback_payload_manager.get(key)
+        except Exception as e:
+            logger.warning(f"读取回调负载失败: {e}")
+            return None
+        if payload is not None:
+            self._cb_payloads[key] = payload
+        return payload
+
+    async def prune_cb_payloads(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """定时清理数据库中已过期的回调负载"""
+        try:
+            deleted = await self.callback_payload_manager.prune_expired()
+            if deleted:
+                logger.info(f"已清理 {deleted} 条过期回调负载")
+        except Exception as e:
+            logger.error(f"清理过期回调负载失败: {e}")
     
     def _parse_message_for_addresses(self, message_text: str) -> Optional[tuple]:
         """从消息文本中解析收款地址和能量提供方作为兜底方案"""
         try:
-            lines = message_text.split('\n')
-            payment_address = None
-            provider_address = None
-            
-            for line in lines:
-                # 查找收款地址行
-                if '【收款地址】' in line and '`' in line:
-                    # 提取反引号内的地址
-                    start = line.find('`') + 1
-                    end = line.rfind('`')
-                    if start > 0 and end > start:
-                        payment_address = line[start:end]
-                
-                # 查找能量提供方行  
-                elif '【能量提供方】' in line and '`' in line:
-                    start = line.find('`') + 1
-                    end = line.rfind('`')
-                    if start > 0 and end > start:
-                        provider_address = line[start:end]
+            payment_match = PAYMENT_LINE_PATTERN.search(message_text)
+            provider_match = PROVIDER_LINE_PATTERN.search(message_text)
             
-            # 验证提取的地址格式
-            if payment_address and provider_address:
-                if (self.blacklist_manager._validate_tron_address(payment_address) and 
-                    self.blacklist_manager._validate_tron_address(provider_address)):
-                    return (payment_address, provider_address)
+            # 两个行模式的捕获组已限定为合法的TRON地址格式，无需再次校验
+            if payment_match and provider_match:
+                return (payment_match.group(1), provider_match.group(1))
             
             return None
             
@@ -127,85 +422,26 @@ class TronEnergyBot:
             logger.error(f"解析消息文本失败: {e}")
             return None
     
-    def _is_message_expired(self, message_date, days=7) -> bool:
+    def _is_message_expired(self, message_date, expiry: timedelta = _EXPIRY_DELTA) -> bool:
         """判断消息是否过期（默认7天）"""
         try:
-            from datetime import datetime, timezone, timedelta
-            current_time = datetime.now(timezone.utc)
-            time_diff = current_time - message_date
-            return time_diff > timedelta(days=days)
+            return datetime.now(timezone.utc) - message_date > expiry
         except Exception as e:
             logger.error(f"判断消息过期失败: {e}")
             return False
 
     def _build_inline_keyboard(self, addr: Dict) -> InlineKeyboardMarkup:
         """为单条地址信息构建操作按钮"""
-        payment = addr.get('address')
-        provider = addr.get('energy_provider')
-        payload_key = self._store_cb_payload(payment, provider)
-        buttons = [
-            [
-                InlineKeyboardButton(
-                    text='✅ 我已成功获得能量（两者加入白名单）',
-                    callback_data=f"vote_success:{payload_key}"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text='❌ 我未获得能量（两者加入黑名单）',
-                    callback_data=f"vote_fail:{payload_key}"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text='▶️ 更多操作',
-                    callback_data=f"more_ops:{payload_key}"
-                )
-            ]
-        ]
-        return InlineKeyboardMarkup(buttons)
+        payload_key = self._store_cb_payload(addr.get('address'), addr.get('energy_provider'))
+        return build_vote_keyboard(payload_key)
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """处理/start命令"""
-        welcome_message = (
-            "👋 欢迎使用Tron能量查找机器人！\n\n"
-            "🔍 使用 /query 命令立即查找低成本能量代理地址\n"
-            "ℹ️ 使用 /help 命令查看更多帮助信息"
-        )
-        await update.message.reply_text(welcome_message)
+        await update.message.reply_text(WELCOME_MSG)
         
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """处理/help命令"""
-        help_message = (
-            "📖 机器人使用帮助：\n\n"
-            "1️⃣ 私聊命令：\n"
-            "   /query - 立即查找低成本能量代理地址\n"
-            "   /help - 显示此帮助信息\n\n"
-            "2️⃣ 频道/群组命令：\n"
-            "   /start_push - 开启定时推送（仅管理员）\n"
-            "   /stop_push - 关闭定时推送（仅管理员）\n"
-            "   /query - 立即查询一次\n"
-            "   /channels - 查看活跃频道列表（仅管理员）\n\n"
-            "3️⃣ 黑名单功能：\n"
-            "   /blacklist_add <地址> [原因] - 添加地址到黑名单\n"
-            "   /blacklist_check <地址> - 查询地址黑名单状态\n"
-            "   /blacklist_remove <地址> - 从黑名单移除地址（仅管理员）\n"
-            "   /blacklist_stats - 查看黑名单统计信息\n\n"
-            "4️⃣ 白名单功能：\n"
-            "   /whitelist_add <地址> <payment|provider> [原因] - 添加地址到白名单\n"
-            "   /whitelist_check <地址> <payment|provider> - 查询白名单状态\n"
-            "   /whitelist_remove <地址> <payment|provider> - 移除白名单（仅管理员）\n"
-            "   /whitelist_stats - 查看白名单统计信息\n\n"
-            "5️⃣ 管理员设置：\n"
-            "   /assoc on|off|status - 黑名单关联开关（仅管理员）\n\n"
-            "6️⃣ 地址检测：\n"
-            "   直接发送TRON地址自动检查黑名单状态\n\n"
-            "💡 注意事项：\n"
-            "   • 频道/群组中使用命令需要授予机器人管理员权限\n"
-            "   • 查询结果中会显示黑/白名单警告信息\n"
-            "   • 发现可疑地址请及时举报到黑名单"
-        )
-        await update.message.reply_text(help_message)
+        await update.message.reply_text(HELP_MSG)
         
     async def check_admin_rights(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
         """检查命令发送者是否为管理员"""
@@ -226,9 +462,16 @@ class TronEnergyBot:
             user = update.effective_user
             if not user:
                 return False
+            
+            # 管理员身份很少变化，缓存5分钟以减少 get_member 请求
+            cache_key = (chat.id, user.id)
+            if cache_key in self._admin_cache:
+                return self._admin_cache[cache_key]
                 
             member = await chat.get_member(user.id)
-            return member.status in ['creator', 'administrator']
+            is_admin = member.status in ['creator', 'administrator']
+            self._admin_cache[cache_key] = is_admin
+            return is_admin
             
         except TelegramError as e:
             logger.error(f"检查管理员权限时出错: {e}")
@@ -258,9 +501,9 @@ class TronEnergyBot:
                     )
                     logger.info(f"已发送确认消息到频道 {chat.id}")
                     
-                    # 立即执行一次查询
-                    await self.broadcast_addresses(context, chat.id)
-                    logger.info(f"已执行初始查询，chat_id={chat.id}")
+                    # 立即执行一次查询（后台执行，不阻塞其它聊天的更新处理）
+                    context.application.create_task(self.broadcast_addresses(context, chat.id))
+                    logger.info(f"已安排初始查询，chat_id={chat.id}")
                     
                 except Exception as e:
                     logger.error(f"发送消息到频道 {chat.id} 失败: {e}")
@@ -333,10 +576,6 @@ class TronEnergyBot:
                 await update.message.reply_text("❌ 无效的TRON地址格式")
                 return
                 
-            # 初始化黑名单管理器
-            if self.blacklist_manager._connection_pool is None:
-                await self.blacklist_manager.init_database()
-                
             # 添加到黑名单
             success = await self.blacklist_manager.add_to_blacklist(
                 address, reason, update.effective_user.id
@@ -346,7 +585,7 @@ class TronEnergyBot:
                 await update.message.reply_text(
                     f"✅ 地址已添加到黑名单\n\n"
                     f"📍 **地址**: `{address}`\n"
-                    f"📝 **原因**: {reason}\n"
+                    f"📝 **原因**: {self._escape_markdown(reason)}\n"
                     f"👤 **提交者**: {update.effective_user.id}",
                     parse_mode='Markdown'
                 )
@@ -372,10 +611,6 @@ class TronEnergyBot:
                 await update.message.reply_text("❌ 无效的TRON地址格式")
                 return
                 
-            # 初始化黑名单管理器
-            if self.blacklist_manager._connection_pool is None:
-                await self.blacklist_manager.init_database()
-                
             # 检查黑名单
             blacklist_info = await self.blacklist_manager.check_blacklist(address)
             
@@ -387,7 +622,7 @@ class TronEnergyBot:
 📍 **地址**: `{address}`
 
 ❌ **状态**: 已列入黑名单
-📝 **原因**: {blacklist_info['reason'] or '未提供原因'}
+📝 **原因**: {self._escape_markdown(blacklist_info['reason'] or '未提供原因')}
 ⏰ **添加时间**: {added_time}
 🔖 **类型**: {'手动添加' if blacklist_info['type'] == 'manual' else '自动关联'}
 👤 **添加者**: {blacklist_info['added_by'] or '未知'}
@@ -427,10 +662,6 @@ class TronEnergyBot:
                 await update.message.reply_text("❌ 无效的TRON地址格式")
                 return
                 
-            # 初始化黑名单管理器
-            if self.blacklist_manager._connection_pool is None:
-                await self.blacklist_manager.init_database()
-                
             # 从黑名单中移除
             success = await self.blacklist_manager.remove_from_blacklist(address)
             
@@ -451,10 +682,6 @@ class TronEnergyBot:
     async def blacklist_stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """查看黑名单统计信息"""
         try:
-            # 初始化黑名单管理器
-            if self.blacklist_manager._connection_pool is None:
-                await self.blacklist_manager.init_database()
-                
             # 获取统计信息
             stats = await self.blacklist_manager.get_blacklist_stats()
             
@@ -561,6 +788,19 @@ class TronEnergyBot:
             logger.error(f"assoc 命令出错: {e}")
             await self._handle_error(update, context, str(e))
 
+    async def refresh_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """清除查询结果缓存：/refresh"""
+        try:
+            if not await self.check_admin_rights(update, context):
+                await update.message.reply_text("❌ 您没有权限执行此操作，只有管理员可以清除缓存")
+                return
+            self.finder.clear_results_cache()
+            await update.message.reply_text("✅ 查询结果缓存已清除，下次查询将重新扫描区块")
+            logger.info("查询结果缓存已手动清除")
+        except Exception as e:
+            logger.error(f"refresh 命令出错: {e}")
+            await self._handle_error(update, context, str(e))
+
     async def channels_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """查看当前活跃频道列表：/channels"""
         try:
@@ -572,23 +812,39 @@ class TronEnergyBot:
                 await update.message.reply_text("📋 **活跃频道列表**\n\n暂无活跃频道", parse_mode='Markdown')
                 return
                 
+            # 先取快照再逐个 await，期间其他协程增删频道不会影响本次遍历
+            channel_ids = tuple(self.active_channels)
             message = "📋 **活跃频道列表**\n\n"
-            message += f"📊 **总数：** {len(self.active_channels)} 个频道\n\n"
+            message += f"📊 **总数：** {len(channel_ids)} 个频道\n\n"
             
-            for i, channel_id in enumerate(self.active_channels, 1):
-                try:
-                    # 尝试获取频道信息
-                    chat = await context.bot.get_chat(channel_id)
-                    chat_title = chat.title or f"未知频道 ({channel_id})"
-                    chat_type = chat.type
-                    message += f"{i}. **{chat_title}**\n   ID: `{channel_id}`\n   类型: {chat_type}\n\n"
-                except Exception as e:
+            # 并发获取所有频道信息（频道标题很少变化，结果缓存1小时）
+            async def get_chat_cached(channel_id: int):
+                if channel_id in self._chat_info_cache:
+                    return self._chat_info_cache[channel_id]
+                chat = await context.bot.get_chat(channel_id)
+                self._chat_info_cache[channel_id] = chat
+                return chat
+            
+            results = await asyncio.gather(
+                *(get_chat_cached(channel_id) for channel_id in channel_ids),
+                return_exceptions=True
+            )
+            
+            for i, (channel_id, chat) in enumerate(zip(channel_ids, results), 1):
+                if isinstance(chat, Exception):
                     # 如果无法获取频道信息，显示错误
-                    message += f"{i}. **无效频道**\n   ID: `{channel_id}`\n   错误: {str(e)[:50]}\n\n"
+                    message += f"{i}. **无效频道**\n   ID: `{channel_id}`\n   错误: {self._escape_markdown(str(chat)[:50])}\n\n"
+                    # 机器人被移出或频道不存在时，直接从活跃列表中移除
+                    if "Forbidden" in str(chat) or "Bad Request" in str(chat):
+                        self.active_channels.discard(channel_id)
+                        logger.info(f"从活跃频道列表中移除无效频道: {channel_id}")
+                    continue
+                chat_title = self._escape_markdown(chat.title or f"未知频道 ({channel_id})")
+                message += f"{i}. **{chat_title}**\n   ID: `{channel_id}`\n   类型: {chat.type}\n\n"
                     
             message += "📝 **说明：**\n"
             message += "- 使用 `/stop_push` 在对应频道中关闭推送\n"
-            message += "- 无效频道将在下次发送失败时自动移除"
+            message += "- 无效频道将在查询或发送失败时自动移除"
                 
             await update.message.reply_text(message, parse_mode='Markdown')
             
@@ -619,13 +875,46 @@ class TronEnergyBot:
         except Exception as e:
             logger.error(f"发送错误消息失败: {e}")
 
+    async def _fetch_addresses(self) -> List[Dict]:
+        """查找低价能量地址；同一时间只进行一次查找，已有查找进行中时直接等待其结果"""
+        if self._inflight_search is None or self._inflight_search.done():
+            self._inflight_search = asyncio.create_task(self.finder.find_low_cost_energy_addresses())
+        # shield：某个调用方被取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(self._inflight_search)
+
+    def _run_in_chat_queue(self, chat_id: int, coro) -> asyncio.Future:
+        """将发送任务加入该聊天的队列，返回任务完成时结束的 Future
+        
+        每个聊天最多一个工作协程，队列清空后自动退出，下次入队时重新创建。
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._chat_queues.setdefault(chat_id, asyncio.Queue())
+        queue.put_nowait((coro, future))
+        worker = self._chat_workers.get(chat_id)
+        if worker is None or worker.done():
+            self._chat_workers[chat_id] = asyncio.create_task(self._chat_worker(chat_id, queue))
+        return future
+
+    async def _chat_worker(self, chat_id: int, queue: asyncio.Queue) -> None:
+        """依次执行单个聊天队列中的任务"""
+        while not queue.empty():
+            coro, future = queue.get_nowait()
+            try:
+                result = await coro
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"聊天 {chat_id} 的队列任务失败: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                queue.task_done()
+        self._chat_workers.pop(chat_id, None)
+        self._chat_queues.pop(chat_id, None)
+
     def _escape_markdown(self, text: str) -> str:
-        """转义 Markdown 特殊字符"""
-        # 转义 Markdown 中的特殊字符
-        special_chars = ['<', '>', '[', ']', '(', ')', '*', '_', '`', '~']
-        for char in special_chars:
-            text = text.replace(char, f'\\{char}')
-        return text
+        """转义 Markdown 特殊字符（用于插入消息的用户/数据库内容）"""
+        return text.translate(MARKDOWN_ESCAPE_TABLE)
 
     def format_address_info(self, addr: Dict) -> str:
         """格式化地址信息为消息文本，包含分层状态展示（方案A）"""
@@ -633,61 +922,41 @@ class TronEnergyBot:
         if addr['energy_source'] == "计算值":
             energy_display = f"{energy_display} (计算值，仅供参考)"
             
-        message = (
-            f"🔹 【收款地址】: `{addr['address']}`\n"
-            f"🔹 【能量提供方】: `{addr['energy_provider']}`\n"
-            f"🔹 【购买记录】: [查看](https://tronscan.org/#/address/{addr['address']})\n"
-            f"🔹 【收款金额】: {addr['purchase_amount']} TRX\n"
-            f"🔹 【能量数量】: {energy_display}\n"
-            f"🔹 【24h交易数】: {addr['recent_tx_count']} 笔\n"
-            f"🔹 【转账哈希】: `{addr['tx_hash']}`\n"
-            f"🔹 【代理哈希】: `{addr['proxy_tx_hash']}`\n\n"
-        )
-
-        # 分层状态展示
-        message += "📊 状态分析：\n"
         # 白名单
-        wl_notice = addr.get('whitelist_notice') or ""
+        wl_notice = self._escape_markdown(addr.get('whitelist_notice') or "")
         if wl_notice:
-            message += f"✅ 白名单状态：\n  └ {wl_notice}\n"
+            whitelist_status = f"✅ 白名单状态：\n  └ {wl_notice}\n"
         else:
             # 逐项显示
+            wl_parts: List[str] = []
             if addr.get('payment_whitelisted'):
-                message += "✅ 白名单状态：\n  └ 收款地址：已在白名单\n"
+                wl_parts.append("✅ 白名单状态：\n  └ 收款地址：已在白名单\n")
             if addr.get('provider_whitelisted'):
-                if '✅ 白名单状态' not in message:
-                    message += "✅ 白名单状态：\n"
-                message += "  └ 能量提供方：已在白名单\n"
-            if not (addr.get('payment_whitelisted') or addr.get('provider_whitelisted')):
-                message += "✅ 白名单状态：暂无记录\n"
+                if not wl_parts:
+                    wl_parts.append("✅ 白名单状态：\n")
+                wl_parts.append("  └ 能量提供方：已在白名单\n")
+            whitelist_status = "".join(wl_parts) or "✅ 白名单状态：暂无记录\n"
 
         # 黑名单
-        bl_warn = addr.get('blacklist_warning') or ""
-        if bl_warn:
-            message += f"\n⚠️ 黑名单状态：\n{bl_warn}\n"
-        else:
-            message += "\n⚠️ 黑名单状态：暂无记录\n"
-            
-        message += f"\n🈹 TRX #{addr['purchase_amount']}\n"
-        message += "\n按钮说明：成功=两者加白；未成功=两者加黑；更多=展开单独添加/撤回"
+        bl_warn = self._escape_markdown(addr.get('blacklist_warning') or "")
+        blacklist_status = f"⚠️ 黑名单状态：\n{bl_warn}\n" if bl_warn else "⚠️ 黑名单状态：暂无记录\n"
 
-        # 如果配置了广告内容，添加到消息末尾
-        if self.advertisement:
-            # 对于广告内容，我们使用 HTML 模式发送，避免 Markdown 解析问题
-            # 但这里先简单替换最常见的问题字符
-            safe_ad = self.advertisement.replace('\\n', '\n')  # 处理换行符
-            message += f"\n\n{safe_ad}"
-            
-        return message
+        return ADDRESS_MESSAGE_TEMPLATE.format_map(_SafeDict(
+            addr,
+            energy_display=energy_display,
+            whitelist_status=whitelist_status,
+            blacklist_status=blacklist_status,
+            footer=self._message_footer,
+        ))
         
-    async def _check_user_cooldown(self, user_id: int) -> bool:
-        """检查用户是否在冷却时间内"""
-        if user_id in self._user_cooldowns:
-            last_query_time = self._user_cooldowns[user_id]
-            time_passed = time.time() - last_query_time
+    def _check_user_cooldown(self, user_id: int) -> Tuple[bool, int]:
+        """检查用户是否在冷却时间内，返回 (是否可查询, 剩余等待秒数)"""
+        last_query_time = self._user_cooldowns.get(user_id)
+        if last_query_time is not None:
+            time_passed = time.monotonic() - last_query_time
             if time_passed < self._min_query_interval:
-                return False
-        return True
+                return False, int(self._min_query_interval - time_passed)
+        return True, 0
         
     async def query_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """处理/query命令"""
@@ -697,56 +966,59 @@ class TronEnergyBot:
                 return
                 
             # 检查用户冷却时间
-            if not await self._check_user_cooldown(user.id):
-                remaining_time = int(self._min_query_interval - (time.time() - self._user_cooldowns[user.id]))
+            can_query, remaining_time = self._check_user_cooldown(user.id)
+            if not can_query:
                 await update.message.reply_text(
                     f"⏳ 请等待 {remaining_time} 秒后再次查询"
                 )
                 return
                 
-            # 使用信号量控制并发
-            async with self._query_semaphore:
-                # 更新用户最后查询时间
-                self._user_cooldowns[user.id] = time.time()
-                
-                # 发送等待消息
-                wait_message = await update.message.reply_text(
-                    "🔍 正在查找低成本能量代理地址，请稍候..."
-                )
+            # 更新用户最后查询时间
+            self._user_cooldowns[user.id] = time.monotonic()
+            
+            # 发送等待消息
+            wait_message = await update.message.reply_text(
+                "🔍 正在查找低成本能量代理地址，请稍候..."
+            )
+            
+            # 查找经由 _fetch_addresses 单飞执行：已有查找进行中时共享其结果
+            addresses = await self._fetch_addresses()
                 
-                # 执行查找
-                addresses = await self.finder.find_low_cost_energy_addresses()
+            if not addresses:
+                await wait_message.edit_text("❌ 未找到符合条件的低价能量地址，请稍后再试")
+                return
                 
-                if not addresses:
-                    await wait_message.edit_text("❌ 未找到符合条件的低价能量地址，请稍后再试")
-                    return
-                    
-                # 删除等待消息，避免出现额外的时间/提示消息
+            # 删除等待消息，避免出现额外的时间/提示消息
+            try:
+                await wait_message.delete()
+            except Exception:
+                pass
+
+            # 为每条地址单独发送消息，并在顶部包含时间；各条消息并发发送，由应用级限速器控制速率
+            current_time = f"{datetime.now():%Y-%m-%d %H:%M:%S}"
+            prefix = f"🎯 查询时间：{current_time}\n\n"
+            chat_id = update.effective_chat.id
+
+            async def send_one(addr: Dict) -> None:
+                text = prefix + self.format_address_info(addr)
+                markup = self._build_inline_keyboard(addr)
+                # 动态文本已在 format_address_info 中转义，广告在启动时已校验，Markdown 解析不会失败，无需纯文本重发
                 try:
-                    await wait_message.delete()
-                except Exception:
-                    pass
+                    await update.message.reply_text(
+                        text=text,
+                        parse_mode='Markdown',
+                        disable_web_page_preview=True,
+                        reply_markup=markup,
+                    )
+                except Exception as e:
+                    logger.error(f"发送查询结果失败: {e}")
 
-                # 为每条地址单独发送消息，并在顶部包含时间
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                prefix = f"🎯 查询时间：{current_time}\n\n"
-                for addr in addresses:
-                    text = prefix + self.format_address_info(addr)
-                    markup = self._build_inline_keyboard(addr)
-                    try:
-                        await update.message.reply_text(
-                            text=text,
-                            parse_mode='Markdown',
-                            disable_web_page_preview=True,
-                            reply_markup=markup,
-                        )
-                    except Exception:
-                        await update.message.reply_text(
-                            text=text,
-                            disable_web_page_preview=True,
-                            reply_markup=markup,
-                        )
-            
+            async def send_all() -> None:
+                await asyncio.gather(*(send_one(addr) for addr in addresses))
+
+            # 经由该聊天的队列发送，避免与同一聊天的定时推送交错
+            await self._run_in_chat_queue(chat_id, send_all())
+        
         except Exception as e:
             logger.error(f"查询出错: {e}")
             try:
@@ -754,6 +1026,13 @@ class TronEnergyBot:
             except:
                 await update.message.reply_text("❌ 查询过程中出现错误，请稍后重试")
 
+    @staticmethod
+    async def _edit_reply_markup(query, markup: InlineKeyboardMarkup) -> None:
+        """更新消息按钮；与消息当前按钮相同（如重复点击）时跳过，避免一次必然失败的请求"""
+        if query.message and query.message.reply_markup == markup:
+            return
+        await query.edit_message_reply_markup(reply_markup=markup)
+
     async def inline_button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """处理内联按钮回调"""
         try:
@@ -766,7 +1045,11 @@ class TronEnergyBot:
             is_expired = message_date and self._is_message_expired(message_date)
             
             action, _, key = query.data.partition(":")
-            payload = self._get_cb_payload(key)
+            # “仍要操作”按钮在原动作前加了 continue_ 前缀，解析一次后按原动作处理
+            confirmed = action.startswith(CONTINUE_PREFIX)
+            if confirmed:
+                action = action[len(CONTINUE_PREFIX):]
+            payload = await self._get_cb_payload(key)
             
             # 处理过期或缓存丢失的情况
             if not payload or is_expired:
@@ -779,33 +1062,23 @@ class TronEnergyBot:
                     # 无法解析，提示过期并更新按钮
                     await query.answer("该消息已过期且无法解析地址信息，请使用最新结果", show_alert=True)
                     try:
-                        expired_buttons = [[
-                            InlineKeyboardButton("已过期（获取最新）", callback_data="expired_get_new")
-                        ]]
-                        await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(expired_buttons))
+                        await self._edit_reply_markup(query, EXPIRED_KEYBOARD)
                     except Exception:
                         pass
                     return
                 else:
                     # 成功解析到地址，询问是否继续
-                    if action in ['vote_success', 'vote_fail', 'more_ops']:
+                    if confirmed:
+                        # 用户确认继续操作，使用解析出的地址继续执行下面的逻辑
+                        payment, provider = fallback_addresses
+                        await query.answer("已使用解析的地址信息执行操作")
+                    elif action in CONFIRMABLE_ACTIONS:
                         await query.answer("该消息已过期，是否仍要操作？", show_alert=True)
                         try:
-                            continue_buttons = [[
-                                InlineKeyboardButton("仍要操作", callback_data=f"continue_{action}:{key}"),
-                                InlineKeyboardButton("取消", callback_data="cancel_expired")
-                            ]]
-                            await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(continue_buttons))
+                            await self._edit_reply_markup(query, build_continue_keyboard(action, key))
                         except Exception:
                             pass
                         return
-                    elif action.startswith('continue_'):
-                        # 用户确认继续操作，使用解析出的地址
-                        payment, provider = fallback_addresses
-                        actual_action = action.replace('continue_', '')
-                        await query.answer("已使用解析的地址信息执行操作")
-                        # 继续执行下面的逻辑，使用解析出的地址
-                        action = actual_action
                     else:
                         await query.answer("操作已取消")
                         return
@@ -817,9 +1090,7 @@ class TronEnergyBot:
             user_id = update.effective_user.id if update.effective_user else None
             if action == 'vote_success':
                 # 两者加入白名单（临时）+ 组合白名单
-                await self.whitelist_manager.add_address(payment, 'payment', f'用户{user_id}反馈成功', user_id, is_provisional=True)
-                await self.whitelist_manager.add_address(provider, 'provider', f'用户{user_id}反馈成功', user_id, is_provisional=True)
-                await self.whitelist_manager.add_pair(payment, provider, user_id, is_provisional=True)
+                await self.whitelist_manager.record_success_vote(payment, provider, user_id, is_provisional=True)
                 
                 # 发送确认消息（不编辑原文）
                 confirmation_text = (
@@ -836,22 +1107,12 @@ class TronEnergyBot:
                 
                 # 更新按钮为已记录状态
                 try:
-                    recorded_buttons = [[
-                        InlineKeyboardButton("✅ 已记录为成功", callback_data="recorded_success"),
-                        InlineKeyboardButton("撤回", callback_data=f"revoke_success:{key}")
-                    ]]
-                    await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(recorded_buttons))
+                    await self._edit_reply_markup(query, build_recorded_vote_keyboard('success', key))
                 except Exception:
                     pass
             elif action == 'vote_fail':
-                # 两者加入黑名单（临时），并尝试单向关联（提供方→收款地址）
-                await self.blacklist_manager.add_to_blacklist(payment, f'用户{user_id}反馈未成功', user_id, 'manual', is_provisional=True)
-                await self.blacklist_manager.add_to_blacklist(provider, f'用户{user_id}反馈未成功', user_id, 'manual', is_provisional=True)
-                # 触发一次关联逻辑（内部有开关）
-                try:
-                    await self.blacklist_manager.auto_associate_addresses(payment, provider)
-                except Exception:
-                    pass
+                # 两者加入黑名单（临时）；收款地址已直接加黑，无需再走单向关联
+                await self.blacklist_manager.record_fail_vote(payment, provider, user_id)
                 
                 # 发送确认消息（不编辑原文）
                 confirmation_text = (
@@ -868,102 +1129,53 @@ class TronEnergyBot:
                 
                 # 更新按钮为已记录状态
                 try:
-                    recorded_buttons = [[
-                        InlineKeyboardButton("❌ 已记录为失败", callback_data="recorded_fail"),
-                        InlineKeyboardButton("撤回", callback_data=f"revoke_fail:{key}")
-                    ]]
-                    await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(recorded_buttons))
+                    await self._edit_reply_markup(query, build_recorded_vote_keyboard('fail', key))
                 except Exception:
                     pass
             elif action == 'more_ops':
                 # 展开更多操作选择
-                buttons = [
-                    [InlineKeyboardButton('🧩 仅收款地址成功（加白）', callback_data=f'only_pay_wl:{key}')],
-                    [InlineKeyboardButton('🔋 仅提供方成功（加白）', callback_data=f'only_prov_wl:{key}')],
-                    [InlineKeyboardButton('🚩 仅收款地址有问题（加黑）', callback_data=f'only_pay_bl:{key}')],
-                    [InlineKeyboardButton('🧨 仅提供方有问题（加黑）', callback_data=f'only_prov_bl:{key}')],
-                    [InlineKeyboardButton('↩️ 撤回我的反馈', callback_data=f'revoke:{key}')],
-                    [InlineKeyboardButton('❌ 取消', callback_data=f'cancel:{key}')],
-                ]
-                await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(buttons))
-            elif action == 'only_pay_wl':
-                await self.whitelist_manager.add_address(payment, 'payment', '用户反馈：仅收款地址成功', user_id, is_provisional=True)
-                # 发送确认消息
-                await context.bot.send_message(
-                    chat_id=query.message.chat_id,
-                    text='✅ 已记录：仅收款地址加入白名单（临时）。如需撤回，请联系管理员。',
-                    reply_to_message_id=query.message.message_id
-                )
-                # 更新按钮
-                try:
-                    recorded_buttons = [[InlineKeyboardButton("✅ 收款地址已加白", callback_data="recorded")]]
-                    await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(recorded_buttons))
-                except Exception:
-                    pass
-            elif action == 'only_prov_wl':
-                await self.whitelist_manager.add_address(provider, 'provider', '用户反馈：仅提供方成功', user_id, is_provisional=True)
-                # 发送确认消息
-                await context.bot.send_message(
-                    chat_id=query.message.chat_id,
-                    text='✅ 已记录：仅能量提供方加入白名单（临时）。如需撤回，请联系管理员。',
-                    reply_to_message_id=query.message.message_id
-                )
-                # 更新按钮
-                try:
-                    recorded_buttons = [[InlineKeyboardButton("✅ 提供方已加白", callback_data="recorded")]]
-                    await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(recorded_buttons))
-                except Exception:
-                    pass
-            elif action == 'only_pay_bl':
-                await self.blacklist_manager.add_to_blacklist(payment, '用户反馈：仅收款地址有问题', user_id, 'manual', is_provisional=True)
-                # 发送确认消息
-                await context.bot.send_message(
-                    chat_id=query.message.chat_id,
-                    text='❌ 已记录：仅收款地址加入黑名单（临时）。如需撤回，请联系管理员。',
-                    reply_to_message_id=query.message.message_id
-                )
-                # 更新按钮
-                try:
-                    recorded_buttons = [[InlineKeyboardButton("❌ 收款地址已加黑", callback_data="recorded")]]
-                    await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(recorded_buttons))
-                except Exception:
-                    pass
-            elif action == 'only_prov_bl':
-                await self.blacklist_manager.add_to_blacklist(provider, '用户反馈：仅提供方有问题', user_id, 'manual', is_provisional=True)
-                try:
-                    await self.blacklist_manager.auto_associate_addresses(payment, provider)
-                except Exception:
-                    pass
+                await self._edit_reply_markup(query, build_more_ops_keyboard(key))
+            elif action in SINGLE_FEEDBACK_ACTIONS:
+                # 单方反馈：仅对收款地址或能量提供方加白/加黑
+                list_kind, role, reason, confirmation_text, _ = SINGLE_FEEDBACK_ACTIONS[action]
+                address = payment if role == 'payment' else provider
+                if list_kind == 'whitelist':
+                    await self.whitelist_manager.add_address(address, role, reason, user_id, is_provisional=True)
+                else:
+                    await self.blacklist_manager.add_to_blacklist(address, reason, user_id, 'manual', is_provisional=True)
+                    if role == 'provider':
+                        # 提供方加黑后尝试单向关联（提供方→收款地址）
+                        try:
+                            await self.blacklist_manager.auto_associate_addresses(payment, provider)
+                        except Exception:
+                            pass
                 # 发送确认消息
                 await context.bot.send_message(
                     chat_id=query.message.chat_id,
-                    text='❌ 已记录：仅能量提供方加入黑名单（临时）。如需撤回，请联系管理员。',
+                    text=confirmation_text,
                     reply_to_message_id=query.message.message_id
                 )
                 # 更新按钮
                 try:
-                    recorded_buttons = [[InlineKeyboardButton("❌ 提供方已加黑", callback_data="recorded")]]
-                    await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(recorded_buttons))
+                    await self._edit_reply_markup(query, SINGLE_FEEDBACK_RECORDED_KEYBOARDS[action])
                 except Exception:
                     pass
             elif action == 'revoke':
                 # 预留：撤回逻辑后续实现（需要记录投票表与时间戳）
                 await query.answer('ℹ️ 撤回功能即将上线，暂请联系管理员处理。', show_alert=True)
-            elif action == 'cancel' or action == 'cancel_expired':
+            elif action in ('cancel', 'cancel_expired'):
                 # 取消操作：恢复原始按钮
                 if payment and provider:
-                    original_markup = self._build_inline_keyboard({
-                        'address': payment,
-                        'energy_provider': provider
-                    })
+                    # 负载仍在缓存中，直接复用原来的键
+                    original_markup = build_vote_keyboard(key)
                     try:
-                        await query.edit_message_reply_markup(reply_markup=original_markup)
+                        await self._edit_reply_markup(query, original_markup)
                         await query.answer("已取消，已恢复原始选项")
                     except Exception:
                         await query.answer("操作已取消")
                 else:
                     await query.answer("操作已取消")
-            elif action in ['recorded_success', 'recorded_fail', 'recorded', 'expired_get_new']:
+            elif action in RECORDED_ACTIONS:
                 # 已记录状态的按钮点击
                 if action == 'expired_get_new':
                     await query.answer("请使用 /query 命令获取最新地址信息", show_alert=True)
@@ -974,66 +1186,110 @@ class TronEnergyBot:
         except Exception as e:
             logger.error(f"处理回调失败: {e}")
             
-    async def broadcast_addresses(self, context: ContextTypes.DEFAULT_TYPE, specific_chat_id: Optional[int] = None) -> None:
-        """向活跃的频道广播地址信息"""
+    async def broadcast_addresses(self, context: ContextTypes.DEFAULT_TYPE, specific_chat_id: Optional[int] = None) -> Optional[bool]:
+        """向活跃的频道广播地址信息
+        
+        Returns:
+            是否找到了地址；未执行查询（无活跃频道或出错）时返回None
+        """
         try:
-            logger.info(f"开始广播地址信息 specific_chat_id={specific_chat_id}")
+            logger.info("开始广播地址信息 specific_chat_id=%s", specific_chat_id)
             
-            # 使用信号量控制并发
-            async with self._query_semaphore:
-                # 如果是定时任务调用且没有活跃频道，直接返回
-                if specific_chat_id is None and not self.active_channels:
-                    logger.info("没有活跃的频道，跳过广播")
-                    return
-                    
-                addresses = await self.finder.find_low_cost_energy_addresses()
+            # 如果是定时任务调用且没有活跃频道，直接返回
+            if specific_chat_id is None and not self.active_channels:
+                logger.info("没有活跃的频道，跳过广播")
+                return None
                 
-                if not addresses:
-                    # 如果没找到地址，发送提示消息
-                    message = "❌ 暂时没有找到符合条件的低价能量地址，稍后将继续为您查询..."
-                    if specific_chat_id is not None:
-                        try:
-                            await context.bot.send_message(
-                                chat_id=specific_chat_id,
-                                text=message
-                            )
-                            logger.info(f"发送'未找到地址'消息到频道 {specific_chat_id}")
-                        except Exception as e:
-                            logger.error(f"发送消息到频道 {specific_chat_id} 失败: {e}")
-                    return
+            # 查找经由 _fetch_addresses 单飞执行：已有查找进行中时共享其结果
+            addresses = await self._fetch_addresses()
                 
-                # 为每条地址发送一条带按钮的消息，时间包含在每条消息顶部
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                prefix = f"⏰ 定时推送 - {current_time}\n\n"
-
-                async def send_to(chat_id: int):
-                    for addr in addresses:
-                        text = prefix + self.format_address_info(addr)
-                        markup = self._build_inline_keyboard(addr)
-                        try:
-                            await context.bot.send_message(
-                                chat_id=chat_id,
-                                text=text,
-                                parse_mode='Markdown',
-                                disable_web_page_preview=True,
-                                reply_markup=markup,
-                            )
-                        except Exception as e:
-                            logger.error(f"发送消息到频道 {chat_id} 失败: {e}")
-                            # 如果是因为机器人被屏蔽或频道不存在，从活跃列表中移除
-                            if "Forbidden" in str(e) or "Bad Request" in str(e):
-                                logger.info(f"从活跃频道列表中移除无效频道: {chat_id}")
-                                self.active_channels.discard(chat_id)
-
+            if not addresses:
+                # 如果没找到地址，发送提示消息
+                message = "❌ 暂时没有找到符合条件的低价能量地址，稍后将继续为您查询..."
                 if specific_chat_id is not None:
-                    await send_to(specific_chat_id)
-                    return
-
-                for channel_id in self.active_channels:
-                    await send_to(channel_id)
+                    try:
+                        await context.bot.send_message(
+                            chat_id=specific_chat_id,
+                            text=message
+                        )
+                        logger.debug("发送'未找到地址'消息到频道 %s", specific_chat_id)
+                    except Exception as e:
+                        logger.error("发送消息到频道 %s 失败: %s", specific_chat_id, e)
+                return False
             
+            # 为每条地址发送一条带按钮的消息，时间包含在每条消息顶部
+            # 消息正文与按钮只生成一次，所有频道共用
+            current_time = f"{datetime.now():%Y-%m-%d %H:%M:%S}"
+            prefix = f"⏰ 定时推送 - {current_time}\n\n"
+            messages = [
+                (prefix + self.format_address_info(addr), self._build_inline_keyboard(addr))
+                for addr in addresses
+            ]
+
+            async def send_to(chat_id: int):
+                sent = 0
+                for text, markup in messages:
+                    try:
+                        # 定时推送不影响交互延迟，遇到 429 时多重试几次再放弃
+                        await context.bot.send_message(
+                            chat_id=chat_id,
+                            text=text,
+                            parse_mode='Markdown',
+                            disable_web_page_preview=True,
+                            reply_markup=markup,
+                            rate_limit_args=BROADCAST_MAX_RETRIES,
+                        )
+                        sent += 1
+                    except Exception as e:
+                        # 如果是因为机器人被屏蔽或频道不存在，从活跃列表中移除
+                        if "Forbidden" in str(e) or "Bad Request" in str(e):
+                            logger.error("发送消息到频道 %s 失败，已从活跃频道列表中移除: %s", chat_id, e)
+                            self.active_channels.discard(chat_id)
+                            # 频道已失效，剩余地址无需再逐条尝试
+                            break
+                        else:
+                            logger.error("发送消息到频道 %s 失败: %s", chat_id, e)
+                logger.debug("已推送 %d/%d 条地址到频道 %s", sent, len(addresses), chat_id)
+
+            if specific_chat_id is not None:
+                await self._run_in_chat_queue(specific_chat_id, send_to(specific_chat_id))
+                return True
+
+            # 每个频道各自排队发送：频道之间并发，同一频道内保持顺序
+            # 发送失败时会从 active_channels 移除频道，因此先取快照
+            channel_ids = tuple(self.active_channels)
+            await asyncio.gather(
+                *(self._run_in_chat_queue(channel_id, send_to(channel_id))
+                  for channel_id in channel_ids),
+                return_exceptions=True
+            )
+            logger.info("广播完成：%d 条地址，%d 个频道", len(addresses), len(channel_ids))
+            return True
+        
         except Exception as e:
-            logger.error(f"广播地址时出错: {e}")
+            logger.error("广播地址时出错: %s", e)
+            return None
+
+    def _next_broadcast_interval(self, found: Optional[bool]) -> int:
+        """根据本次推送结果计算下一次定时推送的间隔（秒）"""
+        if found is False:
+            self._consecutive_empty += 1
+            return min(
+                self._broadcast_max_interval,
+                self._broadcast_interval * (2 ** self._consecutive_empty)
+            )
+        self._consecutive_empty = 0
+        return self._broadcast_interval
+
+    async def scheduled_broadcast(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """定时推送任务：执行一次广播后根据结果重新安排下一次运行"""
+        found = None
+        try:
+            found = await self.broadcast_addresses(context)
+        finally:
+            interval = self._next_broadcast_interval(found)
+            context.job_queue.run_once(self.scheduled_broadcast, when=interval)
+            logger.info("下一次定时推送将在 %d 秒后执行", interval)
             
     async def handle_new_chat_members(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """处理机器人被添加到新频道的事件"""
@@ -1041,24 +1297,79 @@ class TronEnergyBot:
             chat = update.message.chat
             if chat.type in ['channel', 'supergroup']:
                 if chat.id not in self.subscribed_channels:
-                    self.subscribed_channels.append(chat.id)
+                    self.subscribed_channels.add(chat.id)
                     logger.info(f"机器人被添加到新频道: {chat.id}")
                     
-                    # 立即发送一次地址信息
-                    await self.broadcast_addresses()
+                    # 立即向该频道发送一次地址信息（后台执行）
+                    context.application.create_task(self.broadcast_addresses(context, chat.id))
                     
         except Exception as e:
             logger.error(f"处理新成员事件时出错: {e}")
             
+    async def _on_startup(self, application: Application) -> None:
+        """机器人启动时预先初始化黑白名单数据库，失败时留待首次使用再重试"""
+        try:
+            await self.blacklist_manager.ensure_ready()
+        except Exception as e:
+            logger.error(f"黑名单数据库预初始化失败: {e}")
+        try:
+            await self.whitelist_manager.ensure_ready()
+        except Exception as e:
+            logger.error(f"白名单数据库预初始化失败: {e}")
+
+    async def _on_shutdown(self, application: Application) -> None:
+        """机器人停止时关闭HTTP会话与数据库连接池"""
+        try:
+            await self.finder.close()
+        except Exception as e:
+            logger.error(f"关闭HTTP会话失败: {e}")
+        for manager in (self.blacklist_manager, self.whitelist_manager, self.settings_manager,
+                        self.callback_payload_manager):
+            try:
+                await manager.close()
+            except Exception as e:
+                logger.error(f"关闭数据库连接池失败: {e}")
+
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """处理错误"""
         logger.error(f"更新 {update} 导致错误 {context.error}", exc_info=context.error)
         
+    @staticmethod
+    def _build_request() -> HTTPXRequest:
+        """构建发送消息用的 HTTP 客户端：复用连接池，安装了 h2 时启用 HTTP/2"""
+        return FastJsonHTTPXRequest(
+            connection_pool_size=100,
+            read_timeout=20,
+            pool_timeout=None,
+            http_version="2" if h2 is not None else "1.1",
+        )
+
+    @staticmethod
+    def _build_rate_limiter() -> AIORateLimiter:
+        """统一发送限速（Telegram 限制：全局约30条/秒，单个群组/频道20条/分钟），遇 RetryAfter 自动重试一次"""
+        return AIORateLimiter(
+            overall_max_rate=29,
+            overall_time_period=1,
+            group_max_rate=19,
+            group_time_period=60,
+            max_retries=1,
+        )
+
     def run(self):
         """运行机器人"""
         try:
             # 创建应用
-            self.application = Application.builder().token(self.token).build()
+            self.application = (
+                Application.builder()
+                .token(self.token)
+                .request(self._build_request())
+                .rate_limiter(self._build_rate_limiter())
+                # 并发处理更新：慢查询不会阻塞其他用户的命令与按钮回调
+                .concurrent_updates(256)
+                .post_init(self._on_startup)
+                .post_shutdown(self._on_shutdown)
+                .build()
+            )
             
             # 添加命令处理器，允许在频道中使用命令
             self.application.add_handler(CommandHandler("start", self.start_command, filters.ChatType.PRIVATE))
@@ -1090,6 +1401,9 @@ class TronEnergyBot:
             # 黑名单关联开关
             self.application.add_handler(CommandHandler("assoc", self.assoc_command))
             
+            # 清除查询结果缓存
+            self.application.add_handler(CommandHandler("refresh", self.refresh_command))
+            
             # 查看活跃频道列表
             self.application.add_handler(CommandHandler("channels", self.channels_command))
 
@@ -1102,22 +1416,25 @@ class TronEnergyBot:
                 self.handle_new_chat_members
             ))
             
-            # 添加地址检查处理器 - 监听所有文本消息
+            # 添加地址检查处理器 - 仅处理包含TRON地址的文本消息
             self.application.add_handler(MessageHandler(
-                filters.TEXT & ~filters.COMMAND,
+                filters.TEXT & ~filters.COMMAND & filters.Regex(TRON_ADDRESS_PATTERN),
                 self.address_check_handler
             ))
             
             # 添加错误处理器
             self.application.add_error_handler(self.error_handler)
             
-            # 设置定时任务（改为启动后5分钟开始第一次检查）
+            # 设置定时任务（启动后5分钟开始第一次检查，之后由任务自行按结果调整间隔）
+            # 所有频道共用一次查找结果：按频道错开调度会让每个频道各自触发一次区块扫描，
+            # 发送本身已由按频道队列与 AIORateLimiter 平滑，不会阻塞其他更新的处理
             job_queue = self.application.job_queue
-            job_queue.run_repeating(
-                self.broadcast_addresses,
-                interval=3600,  # 每小时运行一次
-                first=300  # 启动5分钟后运行第一次
+            job_queue.run_once(
+                self.scheduled_broadcast,
+                when=300  # 启动5分钟后运行第一次
             )
+            # 每小时清理一次过期的回调负载
+            job_queue.run_repeating(self.prune_cb_payloads, interval=3600, first=600)
             
             logger.info("机器人启动成功，等待命令...")
             
@@ -1143,13 +1460,12 @@ class TronEnergyBot:
             if not addresses:
                 return
                 
-            # 去重
-            unique_addresses = list(set(addresses))
+            # 去重（保持出现顺序），一次查询批量检查黑名单
+            unique_addresses = list(dict.fromkeys(addresses))
+            blacklisted = await self.blacklist_manager.check_blacklist_many(unique_addresses)
             
             for address in unique_addresses:
-                # 检查黑名单
-                blacklist_info = await self.blacklist_manager.check_blacklist(address)
-                
+                blacklist_info = blacklisted.get(address)
                 if blacklist_info:
                     # 地址在黑名单中，发送警告
                     await self._send_blacklist_warning(message, address, blacklist_info)
@@ -1164,19 +1480,12 @@ class TronEnergyBot:
             added_time = blacklist_info['added_at'].strftime("%Y-%m-%d %H:%M:%S") if blacklist_info['added_at'] else "未知"
             
             # 构建警告消息
-            warning_message = f"""🔍 **地址查询结果**
-
-📍 **地址**: `{address}`
-
-❌ **黑名单状态**: 已列入黑名单
-⚠️ **风险提醒**: 此地址已被用户举报，可能存在白名单限制
-📝 **举报原因**: {blacklist_info['reason'] or '未提供原因'}
-⏰ **添加时间**: {added_time}
-🔖 **添加类型**: {'手动添加' if blacklist_info['type'] == 'manual' else '自动关联'}
-
-💡 **建议**: 直接转TRX可能无法获得能量，请谨慎操作！
-
-如有疑问，请联系管理员。"""
+            warning_message = BLACKLIST_WARNING_TEMPLATE.format(
+                address=address,
+                reason=self._escape_markdown(blacklist_info['reason'] or '未提供原因'),
+                added_time=added_time,
+                type_label='手动添加' if blacklist_info['type'] == 'manual' else '自动关联',
+            )
 
             await message.reply_text(warning_message, parse_mode='Markdown')
             
@@ -1199,6 +1508,10 @@ class TronEnergyBot:
 def main():
     """主函数"""
     try:
+        # 在创建事件循环之前安装 uvloop（未安装时使用默认事件循环）
+        if uvloop is not None:
+            uvloop.install()
+            logger.info("已启用 uvloop 事件循环")
         bot = TronEnergyBot()
         bot.run()
     except Exception as e:
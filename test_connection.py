@@ -12,6 +12,7 @@ load_dotenv()
 
 async def test_db_connection():
     """测试数据库连接"""
+    connection = None
     try:
         import asyncpg
         
@@ -19,38 +20,37 @@ async def test_db_connection():
         database_url = os.getenv('DATABASE_URL')
         print(f"🔍 数据库URL: {database_url[:50]}...")
         
-        # 尝试连接
+        # 尝试连接（一次性诊断脚本，单个连接即可，所有检查复用该连接）
         print("🚀 尝试连接数据库...")
         connection = await asyncpg.connect(database_url)
         print("✅ 数据库连接成功!")
         
-        # 测试查询
-        result = await connection.fetch("SELECT 1 as test")
-        print(f"📋 测试查询结果: {result}")
-        
-        # 检查表是否存在
-        table_check = await connection.fetch("""
-            SELECT EXISTS (
+        # 测试查询与检查表是否存在合并为一次往返
+        row = await connection.fetchrow("""
+            SELECT 1 AS test, EXISTS (
                 SELECT FROM information_schema.tables 
                 WHERE table_name = 'blacklist'
-            )
+            ) AS blacklist_exists
         """)
-        print(f"📊 黑名单表存在: {table_check[0]['exists']}")
+        print(f"📋 测试查询结果: {row['test']}")
+        print(f"📊 黑名单表存在: {row['blacklist_exists']}")
         
-        if table_check[0]['exists']:
+        if row['blacklist_exists']:
             # 查询黑名单记录
             records = await connection.fetch("SELECT * FROM blacklist LIMIT 5")
             print(f"📝 黑名单记录数: {len(records)}")
             for record in records:
                 print(f"   - {record['address']}: {record['reason']}")
         
-        await connection.close()
         print("✅ 测试完成")
         
     except Exception as e:
         print(f"❌ 连接失败: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if connection is not None:
+            await connection.close()
 
 if __name__ == '__main__':
     asyncio.run(test_db_connection()) 
\ No newline at end of file
@@ -1,14 +1,15 @@
 import json
 import time
 from datetime import datetime, timedelta
-from tqdm import tqdm
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional, Set, Tuple
+from collections import Counter, deque
 import os
 from dotenv import load_dotenv
 import pathlib
 import asyncio
+import bisect
 from asyncio import Lock
-from cachetools import TTLCache
+from cachetools import LRUCache, TTLCache
 import aiohttp
 import random
 import ssl
@@ -18,13 +19,20 @@ try:
 except ImportError:
     certifi = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 配置日志级别
 import logging
 
 # 配置日志
+# 日志级别可通过 LOG_LEVEL 调整（如 DEBUG 可输出逐笔代理交易明细），默认 INFO
+load_dotenv()
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,  # 默认日志级别为 INFO
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
     handlers=[
         logging.StreamHandler(),  # 只输出到控制台
     ]
@@ -38,90 +46,150 @@ logging.getLogger("apscheduler").setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
+# 只读的空字典，用于缺失 contractData 时避免每次新建
+_EMPTY_DICT: Dict = {}
+
+_ONE_DAY_SECONDS = 86_400
+_ONE_DAY_MS = _ONE_DAY_SECONDS * 1000
+
+# 每 sun 质押可获得的能量（1 TRX = 1_000_000 sun ≈ 11.3661 能量）
+_ENERGY_PER_SUN = 11.3661 / 1_000_000
+
+
+def _json_loads(data):
+    """解析JSON（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dump_line(obj) -> bytes:
+    """序列化为单行UTF-8 JSON并以换行结尾（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
 class APIKeyManager:
-    def __init__(self, api_keys: List[str]):
+    # 默认每个 key 每秒最多5次请求（TronScan 免费额度）
+    RATE_PER_SECOND = 5.0
+
+    def __init__(self, api_keys: List[str], rate_per_second: Optional[float] = None):
         """初始化 API Key 管理器"""
         self.api_keys = api_keys
         self.current_key_index = 0
-        self.request_times = {key: [] for key in api_keys}  # 记录每个 key 的请求时间
+        if rate_per_second is not None:
+            self.RATE_PER_SECOND = rate_per_second
+        # 每个 key 一个令牌桶：容量与每秒补充量均为 RATE_PER_SECOND
+        now = time.monotonic()
+        self.tokens = {key: self.RATE_PER_SECOND for key in api_keys}
+        self.updated_at = {key: now for key in api_keys}
         self.daily_request_count = 0  # 记录当天的总请求次数
-        self.last_reset_time = datetime.now()  # 上次重置计数的时间
-        self._lock = asyncio.Lock()
+        self._last_reset_day = int(time.time() // _ONE_DAY_SECONDS)  # 上次重置计数的日期（UTC 纪元日）
         
     async def get_next_key(self) -> str:
-        """获取下一个可用的 API Key"""
-        async with self._lock:
+        """获取下一个可用的 API Key
+        
+        令牌的计算与扣减之间没有 await，在事件循环中天然是原子的，无需加锁；
+        所有 key 的令牌都用完时才等待，因此多个请求可以同时进行，只受速率限制。
+        """
+        while True:
             # 检查是否需要重置每日计数
-            now = datetime.now()
-            if now.date() > self.last_reset_time.date():
+            today = int(time.time() // _ONE_DAY_SECONDS)
+            if today > self._last_reset_day:
                 self.daily_request_count = 0
-                self.last_reset_time = now
+                self._last_reset_day = today
             
             # 检查是否达到每日限制
             if self.daily_request_count >= 100000:
                 raise Exception("已达到每日 API 请求限制")
             
-            # 清理超过1秒的请求记录
-            current_time = time.time()
-            for key in self.api_keys:
-                self.request_times[key] = [t for t in self.request_times[key] 
-                                         if current_time - t < 1]
-            
-            # 查找可用的 key
+            # 从当前 key 开始轮询，补充令牌后取第一个有令牌的 key
+            current_time = time.monotonic()
+            wait_time = None
             for _ in range(len(self.api_keys)):
                 key = self.api_keys[self.current_key_index]
-                if len(self.request_times[key]) < 5:  # 每秒限制5次
-                    self.request_times[key].append(current_time)
+                tokens = min(
+                    self.RATE_PER_SECOND,
+                    self.tokens[key] + (current_time - self.updated_at[key]) * self.RATE_PER_SECOND,
+                )
+                self.updated_at[key] = current_time
+                if tokens >= 1:
+                    self.tokens[key] = tokens - 1
                     self.daily_request_count += 1
                     return key
+                self.tokens[key] = tokens
                 
+                key_wait = (1 - tokens) / self.RATE_PER_SECOND
+                wait_time = key_wait if wait_time is None else min(wait_time, key_wait)
                 self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-            
-            # 如果所有 key 都达到限制，等待最早的请求过期
-            earliest_time = min(min(times) for times in self.request_times.values() if times)
-            wait_time = max(0, 1 - (current_time - earliest_time))
-            if wait_time > 0:
-                await asyncio.sleep(wait_time)
-            return await self.get_next_key()
+        
+            # 所有 key 都没有令牌，等待最早补充的令牌
+            await asyncio.sleep(wait_time)
+
 
 class TronEnergyFinder:
+    # 同时进行的接收地址分析数：找到首个符合条件的地址即停止，
+    # 并发过多会让已发出的分析请求白白消耗 API 配额
+    MAX_CONCURRENT_ANALYSES = 2
+
     def __init__(self):
         """初始化 Tron 能量查找器"""
         # 加载环境变量
         load_dotenv()
         
-        # 获取当前目录
-        current_dir = os.getcwd()
-        env_path = os.path.join(current_dir, '.env')
-        
-        # 减少初始化时的日志输出
-        logger.debug(f"当前目录: {current_dir}")
-        logger.debug(f"环境变量文件路径: {env_path}")
-        logger.debug(f"环境变量文件是否存在: {os.path.exists(env_path)}")
+        # 减少初始化时的日志输出（仅在 DEBUG 级别检查 .env 文件）
+        if logger.isEnabledFor(logging.DEBUG):
+            current_dir = os.getcwd()
+            env_path = os.path.join(current_dir, '.env')
+            logger.debug(f"当前目录: {current_dir}")
+            logger.debug(f"环境变量文件路径: {env_path}")
+            logger.debug(f"环境变量文件是否存在: {os.path.exists(env_path)}")
         
         # 获取 API Keys
+        # 一次遍历环境变量收集 TRON_API_KEY_<序号>，按序号排序
+        numbered_keys = sorted(
+            (int(name[len("TRON_API_KEY_"):]), value)
+            for name, value in os.environ.items()
+            if name.startswith("TRON_API_KEY_") and name[len("TRON_API_KEY_"):].isdigit() and value
+        )
         api_keys = []
-        i = 1
-        while True:
-            key = os.getenv(f"TRON_API_KEY_{i}")
-            if not key:
-                break
+        for i, key in numbered_keys:
             api_keys.append(key)
             logger.debug(f"成功加载 TRON_API_KEY_{i}: {key[:8]}...")  # 改为 DEBUG 级别
-            i += 1
         
         if not api_keys:
             raise ValueError("请在.env文件中设置至少一个 TRON_API_KEY")
         
         logger.info(f"成功加载 {len(api_keys)} 个 API Key")  # 保留重要信息为 INFO 级别
         
-        self.api_manager = APIKeyManager(api_keys)
+        # 每个 key 的每秒请求上限，可通过 TRON_RATE_LIMIT 调整（默认5）
+        rate_limit = None
+        rate_limit_env = os.getenv("TRON_RATE_LIMIT")
+        if rate_limit_env:
+            try:
+                rate_limit = float(rate_limit_env)
+                if rate_limit <= 0:
+                    raise ValueError
+            except ValueError:
+                logger.warning(f"TRON_RATE_LIMIT 配置无效: {rate_limit_env}，使用默认值 {APIKeyManager.RATE_PER_SECOND}")
+                rate_limit = None
+        
+        self.api_manager = APIKeyManager(api_keys, rate_limit)
         self.tronscan_api = "https://apilist.tronscan.org/api"
+        # 各接口地址只拼接一次
+        self._block_url = f"{self.tronscan_api}/block"
+        self._transaction_url = f"{self.tronscan_api}/transaction"
+        self._transaction_info_url = f"{self.tronscan_api}/transaction-info"
         
         # 创建results目录
         self.results_dir = pathlib.Path("results")
         self.results_dir.mkdir(exist_ok=True)
         
+        # 当天结果文件中已记录的代理哈希（日期变化时从文件重建）
+        self._seen_proxy_hashes: Set[str] = set()
+        self._seen_file: Optional[pathlib.Path] = None
+        
         # 文件清理配置
         self.cleanup_enabled = True              # 是否启用自动清理
         self.retention_days = 7                  # 保留天数（默认7天）
@@ -129,23 +197,32 @@ class TronEnergyFinder:
         self.last_cleanup_date = None           # 记录最后清理的日期，避免同一天重复清理
         
         # 初始化缓存
-        self._block_cache = {}  # 区块缓存
-        self._analyzed_addresses = set()  # 已分析的地址集合
-        self._energy_amount_cache = {}  # 能量数量缓存
-        self._transaction_info_cache = {}  # 交易信息缓存
+        # 区块与交易内容上链后不会变化，使用有界缓存跨多次查找复用。
+        # 每次查找只扫描最新的几个区块，重启后旧交易几乎不会再被查询，因此不做持久化
+        self._block_cache = TTLCache(maxsize=100, ttl=600)  # 区块缓存
+        self._analyzed_addresses = set()  # 本次查找已分析的地址集合（每次查找重置）
+        # 单笔交易的详情与能量数量不会变化，按LRU淘汰即可，不设过期时间
+        self._energy_amount_cache = LRUCache(maxsize=5000)  # 能量数量缓存
+        self._transaction_info_cache = LRUCache(maxsize=5000)  # 交易信息缓存
         self._results_cache = TTLCache(maxsize=100, ttl=60)  # 结果缓存60秒
+        self._empty_results_cache = TTLCache(maxsize=100, ttl=15)  # 空结果缓存15秒，新区块出块快，尽早重试
+        self._inflight_tx_info: Dict[str, asyncio.Task] = {}  # 进行中的交易详情请求
+        # 地址最近交易：同一地址在一次查找中可能既是代理接收方又是收款地址，短时缓存只覆盖一次查找
+        self._address_tx_cache = TTLCache(maxsize=2000, ttl=30)
+        self._inflight_address_txs: Dict[str, asyncio.Task] = {}  # 进行中的地址交易请求
+        # 近期转账统计不达标的收款地址，TTL内不再重复请求其交易记录
+        self._negative_receiver_cache = TTLCache(maxsize=5000, ttl=300)
         
         # 添加锁机制
-        self._api_lock = Lock()
-        self._cache_lock = Lock()
-        
-        # 添加API请求限制
-        self._last_api_call = 0
-        self._min_api_interval = 0.1  # 最小API调用间隔（秒）
+        self._search_lock = Lock()  # 合并并发的查找请求，同一时间只执行一次完整查找
+        self._request_semaphore = asyncio.Semaphore(8)  # 限制同时进行的API请求数，避免触发限流
         
         # SSL上下文
         self._ssl_context = self._build_ssl_context()
         
+        # HTTP会话（首次请求时创建，整个生命周期复用连接池与keep-alive）
+        self._session: Optional[aiohttp.ClientSession] = None
+        
         # 黑名单管理器（延迟初始化）
         self._blacklist_manager = None
         # 白名单管理器（延迟初始化）
@@ -166,13 +243,42 @@ class TronEnergyFinder:
             logger.warning(f"创建SSL context失败: {e}，使用默认配置")
             return ssl.create_default_context()
         
+    async def __aenter__(self) -> "TronEnergyFinder":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取复用的HTTP会话，不存在或已关闭时创建"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=self._ssl_context,
+                limit=32,
+                limit_per_host=8,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Accept": "application/json"},
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """关闭HTTP会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     async def init_blacklist_manager(self):
         """初始化黑名单管理器"""
         if self._blacklist_manager is None:
             try:
                 from blacklist_manager import BlacklistManager
                 self._blacklist_manager = BlacklistManager()
-                await self._blacklist_manager.init_database()
+                await self._blacklist_manager.ensure_ready()
                 logger.info("黑名单管理器初始化成功")
             except Exception as e:
                 logger.warning(f"黑名单管理器初始化失败: {e}")
@@ -184,7 +290,7 @@ class TronEnergyFinder:
             try:
                 from whitelist_manager import WhitelistManager
                 self._whitelist_manager = WhitelistManager()
-                await self._whitelist_manager.init_database()
+                await self._whitelist_manager.ensure_ready()
                 logger.info("白名单管理器初始化成功")
             except Exception as e:
                 logger.warning(f"白名单管理器初始化失败: {e}")
@@ -221,9 +327,12 @@ class TronEnergyFinder:
             payment_wl = None
             provider_wl = None
             if self._whitelist_manager is not None:
-                pair_info = await self._whitelist_manager.check_pair(payment_address, energy_provider)
-                payment_wl = await self._whitelist_manager.check_address(payment_address, 'payment')
-                provider_wl = await self._whitelist_manager.check_address(energy_provider, 'provider')
+                # 三项查询互不依赖，并发执行（各自带缓存，命中时不访问数据库）
+                pair_info, payment_wl, provider_wl = await asyncio.gather(
+                    self._whitelist_manager.check_pair(payment_address, energy_provider),
+                    self._whitelist_manager.check_address(payment_address, 'payment'),
+                    self._whitelist_manager.check_address(energy_provider, 'provider'),
+                )
 
             if pair_info:
                 result['pair_whitelisted'] = True
@@ -245,13 +354,15 @@ class TronEnergyFinder:
             if self._blacklist_manager is None:
                 return result
 
-            payment_info = await self._blacklist_manager.check_blacklist(payment_address)
+            # 两个地址合并为一次查询（缓存命中的地址不访问数据库）
+            blacklisted = await self._blacklist_manager.check_blacklist_many([payment_address, energy_provider])
+            payment_info = blacklisted.get(payment_address)
             if payment_info:
                 result['payment_blacklisted'] = True
                 provisional_tag = '（临时）' if payment_info.get('is_provisional') else ''
                 result['blacklist_warning'] += f"⚠️ 收款地址已列入黑名单{provisional_tag}: {payment_info.get('reason', '未提供原因')}\n"
 
-            provider_info = await self._blacklist_manager.check_blacklist(energy_provider)
+            provider_info = blacklisted.get(energy_provider)
             if provider_info:
                 result['provider_blacklisted'] = True
                 provisional_tag = '（临时）' if provider_info.get('is_provisional') else ''
@@ -270,20 +381,23 @@ class TronEnergyFinder:
 
         return result
         
-    def _get_result_file(self) -> pathlib.Path:
+    def _get_result_file(self, now: Optional[datetime] = None) -> pathlib.Path:
         """获取当天的结果文件路径"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        return self.results_dir / f"energy_addresses_{today}.json"
+        today = (now or datetime.now()).strftime("%Y-%m-%d")
+        return self.results_dir / f"energy_addresses_{today}.ndjson"
         
     def _get_file_date_from_name(self, filename: str) -> Optional[datetime]:
         """从文件名中解析日期"""
         try:
-            # 解析格式：energy_addresses_YYYY-MM-DD.json
-            if not filename.startswith("energy_addresses_") or not filename.endswith(".json"):
+            # 解析格式：energy_addresses_YYYY-MM-DD.ndjson（兼容旧的 .json 文件）
+            if not filename.startswith("energy_addresses_"):
+                return None
+            stem, _, suffix = filename.partition(".")
+            if suffix not in ("ndjson", "json"):
                 return None
             
             # 提取日期部分
-            date_part = filename[len("energy_addresses_"):-len(".json")]
+            date_part = stem[len("energy_addresses_"):]
             
             # 验证日期格式 YYYY-MM-DD
             if len(date_part) != 10 or date_part[4] != '-' or date_part[7] != '-':
@@ -398,56 +512,69 @@ class TronEnergyFinder:
             self.cleanup_enabled = original_enabled
             self.retention_days = original_retention_days
         
-    def _load_existing_results(self) -> Dict:
-        """加载已有的结果"""
-        result_file = self._get_result_file()
-        if result_file.exists():
-            try:
-                with open(result_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                print(f"警告: 结果文件 {result_file} 格式错误，将创建新文件")
-        return {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "records": []
-        }
-        
-    async def _wait_for_api_limit(self):
-        """等待API限制"""
-        current_time = time.time()
-        if current_time - self._last_api_call < self._min_api_interval:
-            await asyncio.sleep(self._min_api_interval)
-        self._last_api_call = current_time
+    def _load_seen_proxy_hashes(self, result_file: pathlib.Path) -> Set[str]:
+        """逐行读取结果文件，收集已记录的代理哈希"""
+        seen = set()
+        if not result_file.exists():
+            return seen
+        with open(result_file, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    seen.add(_json_loads(line)["proxy_tx_hash"])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"结果文件 {result_file} 中有无法解析的行，已跳过")
+        return seen
         
-    async def _make_request(self, url: str, params: Dict = None) -> Optional[Dict]:
-        """发送 API 请求"""
-        try:
-            # 获取下一个可用的 API Key
-            api_key = await self.api_manager.get_next_key()
-            
-            headers = {
-                "TRON-PRO-API-KEY": api_key,
-                "Accept": "application/json"
-            }
-            
-            connector = aiohttp.TCPConnector(ssl=self._ssl_context)
-            
-            async with aiohttp.ClientSession(connector=connector) as session:
-                async with session.get(url, params=params, headers=headers) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
+    @staticmethod
+    def _retry_delay(attempt: int, retry_after: Optional[str] = None,
+                     base: float = 0.5, cap: float = 8.0) -> float:
+        """计算重试等待时间：优先使用 Retry-After，否则为带完全抖动的指数退避"""
+        if retry_after:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                pass
+        return random.uniform(0, min(cap, base * 2 ** attempt))
+
+    async def _make_request(self, url: str, params: Dict = None,
+                            max_attempts: int = 3) -> Optional[Dict]:
+        """发送 API 请求（限流和服务端错误时退避重试，其余4xx不重试）"""
+        for attempt in range(max_attempts):
+            retry_after = None
+            try:
+                # 获取下一个可用的 API Key
+                api_key = await self.api_manager.get_next_key()
+                
+                # API Key 按请求轮换，其余请求头设置在会话上
+                headers = {"TRON-PRO-API-KEY": api_key}
+                
+                async with self._request_semaphore:
+                    async with self._get_session().get(url, params=params, headers=headers) as response:
+                        if response.status == 200:
+                            return _json_loads(await response.read())
+                        
                         logger.error(f"API请求失败: {response.status} - {await response.text()}")
-                        return None
+                        if response.status != 429 and response.status < 500:
+                            return None
+                        retry_after = response.headers.get("Retry-After")
                         
-        except Exception as e:
-            logger.error(f"请求失败: {e}")
-            return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"请求失败: {e!r}")
+            except Exception as e:
+                logger.error(f"请求失败: {e}")
+                return None
+            
+            if attempt + 1 < max_attempts:
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+        
+        return None
 
     async def get_latest_block(self) -> Optional[int]:
         """获取最新区块号"""
         try:
-            response = await self._make_request(f"{self.tronscan_api}/block", {
+            response = await self._make_request(self._block_url, {
                 "sort": "-number",
                 "limit": "1",
                 "count": "true"
@@ -460,12 +587,49 @@ class TronEnergyFinder:
             return None
 
     async def get_transaction_info(self, tx_hash: str) -> Dict:
-        """获取交易详细信息（带缓存）"""
+        """获取交易详细信息（带缓存；同一哈希的并发请求共享一次API调用）"""
         if tx_hash in self._transaction_info_cache:
             return self._transaction_info_cache[tx_hash]
-            
+        
+        return await self._single_flight(
+            self._inflight_tx_info, tx_hash, lambda: self._fetch_transaction_info(tx_hash)
+        )
+
+    @staticmethod
+    async def _single_flight(inflight: Dict[str, asyncio.Task], key: str, factory):
+        """同一 key 的并发请求共享一个任务"""
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        # shield：某个调用方被取消时不影响其他等待同一请求的调用方
+        return await asyncio.shield(task)
+
+    async def get_address_transactions(self, address: str) -> Optional[List[Dict]]:
+        """获取地址最近50笔交易（短时缓存；同一地址的并发请求共享一次API调用）"""
+        if address in self._address_tx_cache:
+            return self._address_tx_cache[address]
+        return await self._single_flight(
+            self._inflight_address_txs, address, lambda: self._fetch_address_transactions(address)
+        )
+
+    async def _fetch_address_transactions(self, address: str) -> Optional[List[Dict]]:
+        """请求地址最近交易并写入缓存，失败时返回 None"""
+        response = await self._make_request(self._transaction_url, {
+            "address": address,
+            "limit": 50,
+            "sort": "-timestamp"
+        })
+        if not response or "data" not in response:
+            return None
+        self._address_tx_cache[address] = response["data"]
+        return response["data"]
+
+    async def _fetch_transaction_info(self, tx_hash: str) -> Dict:
+        """请求交易详细信息并写入缓存"""
         try:
-            response = await self._make_request(f"{self.tronscan_api}/transaction-info", {
+            response = await self._make_request(self._transaction_info_url, {
                 "hash": tx_hash
             })
             if response:
@@ -475,10 +639,22 @@ class TronEnergyFinder:
             logger.error(f"获取交易详情失败: {e}")
             return {}
 
-    async def get_energy_amount(self, tx_hash: str) -> Optional[float]:
-        """获取交易中的实际能量数量（带缓存）"""
+    async def get_energy_amount(self, tx_hash: str, contract_data: Optional[Dict] = None) -> Optional[float]:
+        """获取交易中的实际能量数量（带缓存）
+        
+        已有交易的 contractData 中包含 resourceValue 时直接使用，不再请求交易详情
+        """
         if tx_hash in self._energy_amount_cache:
             return self._energy_amount_cache[tx_hash]
+        
+        if contract_data and "resourceValue" in contract_data:
+            try:
+                energy_amount = float(contract_data["resourceValue"])
+            except (ValueError, TypeError):
+                pass
+            else:
+                self._energy_amount_cache[tx_hash] = energy_amount
+                return energy_amount
             
         tx_info = await self.get_transaction_info(tx_hash)
         if tx_info and "contractData" in tx_info:
@@ -490,8 +666,7 @@ class TronEnergyFinder:
                 energy_amount = float(contract_data["resourceValue"])
             # 如果没有 resourceValue，则使用 balance 计算
             elif "balance" in contract_data:
-                staked_trx = float(contract_data["balance"]) / 1_000_000
-                energy_amount = staked_trx * 11.3661
+                energy_amount = float(contract_data["balance"]) * _ENERGY_PER_SUN
                 
             if energy_amount is not None:
                 self._energy_amount_cache[tx_hash] = energy_amount
@@ -499,6 +674,31 @@ class TronEnergyFinder:
                 
         return None
 
+    @staticmethod
+    def _summarize_recent_payments(receiver_txs: List[Dict]) -> Tuple[Optional[float], int, int]:
+        """统计收款地址24小时内 0.1~1 TRX 的转账
+        
+        返回 (出现次数最多的金额, 该金额的次数, 符合条件的转账总数)
+        """
+        cutoff = time.time_ns() // 1_000_000 - _ONE_DAY_MS
+        amount_count = Counter()
+        for rtx in receiver_txs:
+            get = rtx.get
+            if get("contractType") != 1 or get("timestamp", 0) < cutoff:
+                continue
+            try:
+                rtx_amount = round(float(get("amount", 0)) / 1_000_000, 4)
+            except (ValueError, TypeError):
+                continue
+            if 0.1 <= rtx_amount <= 1:
+                amount_count[rtx_amount] += 1
+        
+        if not amount_count:
+            return None, 0, 0
+        # most_common 在次数相同时保留先出现的金额
+        max_amount, max_count = amount_count.most_common(1)[0]
+        return max_amount, max_count, sum(amount_count.values())
+
     async def analyze_address(self, address: str) -> Optional[Dict]:
         """分析地址的交易记录"""
         # 检查是否已分析过
@@ -509,125 +709,104 @@ class TronEnergyFinder:
         
         try:
             # 减少日志输出，只在 DEBUG 级别输出详细信息
-            logger.debug(f"分析地址: {address}")
+            logger.debug("分析地址: %s", address)
             
             # 获取地址的最近交易记录
-            response = await self._make_request(f"{self.tronscan_api}/transaction", {
-                "address": address,
-                "limit": 50,
-                "sort": "-timestamp"
-            })
-            
-            if not response or "data" not in response:
+            transactions = await self.get_address_transactions(address)
+            if transactions is None:
                 return None
-                
-            transactions = response["data"]
             
-            # 先找到代理资源交易
+            # 一次遍历收集 0.1~1 TRX 的转账（交易按时间倒序），供各代理交易匹配
+            payments = []
+            for j, ptx in enumerate(transactions):
+                get = ptx.get
+                if get("contractType") != 1:
+                    continue
+                try:
+                    amount = round(float(get("amount", 0)) / 1_000_000, 4)
+                except (ValueError, TypeError):
+                    continue
+                if 0.1 <= amount <= 1:
+                    payments.append((j, ptx))
+            payment_indices = [j for j, _ in payments]
+            
+            # 同一收款地址可能与多笔代理交易匹配，每个收款地址只请求并统计一次
+            checked_receivers = set()
+            
+            # 找到代理资源交易，再匹配在它之前发生的TRX转账
             for i, tx in enumerate(transactions):
-                if tx.get("contractType") == 57:
-                    contract_data = tx.get("contractData", {})
-                    if contract_data.get("resource") == "ENERGY":
-                        proxy_time = tx.get("timestamp", 0)
-                        energy_provider = contract_data.get("owner_address")
+                if tx.get("contractType") != 57:
+                    continue
+                contract_data = tx.get("contractData") or _EMPTY_DICT
+                if contract_data.get("resource") != "ENERGY":
+                    continue
+                proxy_time = tx.get("timestamp", 0)
+                energy_provider = contract_data.get("owner_address")
+                
+                # 交易按时间倒序，只有位于代理交易之后的转账才可能更早发生，二分跳过之前的部分
+                for _, prev_tx in payments[bisect.bisect_right(payment_indices, i):]:
+                    if prev_tx.get("timestamp", 0) >= proxy_time:
+                        continue
+                    trx_receiver = prev_tx.get("toAddress")
+                    if trx_receiver in checked_receivers or trx_receiver in self._negative_receiver_cache:
+                        continue
+                    checked_receivers.add(trx_receiver)
+                    
+                    # 获取收款地址的最近交易记录
+                    receiver_txs = await self.get_address_transactions(trx_receiver)
+                    if receiver_txs is None:
+                        continue
+                        
+                    # 分析收款地址的最近交易（不足20笔时不可能达标，无需统计）
+                    if len(receiver_txs) < 20:
+                        max_amount, max_count, total_count = None, 0, 0
+                    else:
+                        max_amount, max_count, total_count = self._summarize_recent_payments(receiver_txs)
+                            
+                    # 只在找到符合条件的交易时输出日志
+                    if max_count >= 5 and total_count >= 20:
+                        logger.info(f"找到符合条件的地址: {trx_receiver}")
+                        energy_amount = await self.get_energy_amount(tx.get("hash"), contract_data)
+                        
+                        if energy_amount is None:
+                            energy_amount = float(contract_data.get("balance", 0)) * _ENERGY_PER_SUN
+                            energy_source = "计算值"
+                        else:
+                            energy_source = "API值"
+                            
+                        # 执行黑名单检查
+                        blacklist_result = await self.check_and_handle_blacklist(trx_receiver, energy_provider)
                         
-                        # 向后查找是否有对应的TRX转账
-                        for j in range(i + 1, len(transactions)):
-                            prev_tx = transactions[j]
-                            if (prev_tx.get("contractType") == 1 and 
-                                prev_tx.get("timestamp", 0) < proxy_time):
-                                try:
-                                    amount = float(prev_tx.get("amount", 0)) / 1_000_000
-                                    amount = round(amount, 4)
-                                    if 0.1 <= amount <= 1:
-                                        trx_receiver = prev_tx.get("toAddress")
-                                        
-                                        # 获取收款地址的最近交易记录
-                                        receiver_response = await self._make_request(
-                                            f"{self.tronscan_api}/transaction",
-                                            {
-                                                "address": trx_receiver,
-                                                "limit": 50,
-                                                "sort": "-timestamp"
-                                            }
-                                        )
-                                        
-                                        if not receiver_response or "data" not in receiver_response:
-                                            continue
-                                            
-                                        receiver_txs = receiver_response["data"]
-                                        current_time = int(time.time() * 1000)
-                                        amount_count = {}
-                                        total_count = 0
-                                        
-                                        # 分析收款地址的最近交易
-                                        for rtx in receiver_txs:
-                                            tx_time = rtx.get("timestamp", 0)
-                                            if current_time - tx_time > 24 * 60 * 60 * 1000:
-                                                continue
-                                                
-                                            if rtx.get("contractType") == 1:
-                                                try:
-                                                    rtx_amount = float(rtx.get("amount", 0)) / 1_000_000
-                                                    rtx_amount = round(rtx_amount, 4)
-                                                    if 0.1 <= rtx_amount <= 1:
-                                                        amount_count[rtx_amount] = amount_count.get(rtx_amount, 0) + 1
-                                                        total_count += 1
-                                                except (ValueError, TypeError):
-                                                    continue
-                                        
-                                        # 检查交易数量
-                                        max_count = max(amount_count.values()) if amount_count else 0
-                                        max_amount = None
-                                        for amt, cnt in amount_count.items():
-                                            if cnt == max_count:
-                                                max_amount = amt
-                                                break
-                                                
-                                        # 只在找到符合条件的交易时输出日志
-                                        if max_count >= 5 and total_count >= 20:
-                                            logger.info(f"找到符合条件的地址: {trx_receiver}")
-                                            energy_amount = await self.get_energy_amount(tx.get("hash"))
-                                            
-                                            if energy_amount is None:
-                                                staked_trx = float(contract_data.get("balance", 0)) / 1_000_000
-                                                energy_amount = staked_trx * 11.3661
-                                                energy_source = "计算值"
-                                            else:
-                                                energy_source = "API值"
-                                                
-                                            # 执行黑名单检查
-                                            blacklist_result = await self.check_and_handle_blacklist(trx_receiver, energy_provider)
-                                            
-                                            # 构建基础结果
-                                            result = {
-                                                "address": trx_receiver,
-                                                "energy_provider": energy_provider,
-                                                "purchase_amount": max_amount,
-                                                "energy_quantity": f"{energy_amount:,.2f} 能量",
-                                                "energy_source": energy_source,
-                                                "tx_hash": prev_tx.get("hash"),
-                                                "proxy_tx_hash": tx.get("hash"),
-                                                "recent_tx_count": total_count,
-                                                "recent_tx_amount": max_amount,
-                                                "status": "正常使用"
-                                            }
-                                            
-                                            # 添加黑名单和白名单相关信息
-                                            result.update({
-                                                "payment_blacklisted": blacklist_result['payment_blacklisted'],
-                                                "provider_blacklisted": blacklist_result['provider_blacklisted'],
-                                                "blacklist_warning": blacklist_result['blacklist_warning'],
-                                                "auto_associated": blacklist_result['auto_associated'],
-                                                "payment_whitelisted": blacklist_result['payment_whitelisted'],
-                                                "provider_whitelisted": blacklist_result['provider_whitelisted'],
-                                                "pair_whitelisted": blacklist_result['pair_whitelisted'],
-                                                "whitelist_notice": blacklist_result['whitelist_notice']
-                                            })
-                                            
-                                            return result
-                                except (ValueError, TypeError):
-                                    continue
+                        # 构建基础结果
+                        result = {
+                            "address": trx_receiver,
+                            "energy_provider": energy_provider,
+                            "purchase_amount": max_amount,
+                            "energy_quantity": f"{energy_amount:,.2f} 能量",
+                            "energy_source": energy_source,
+                            "tx_hash": prev_tx.get("hash"),
+                            "proxy_tx_hash": tx.get("hash"),
+                            "recent_tx_count": total_count,
+                            "recent_tx_amount": max_amount,
+                            "status": "正常使用"
+                        }
+                        
+                        # 添加黑名单和白名单相关信息
+                        result.update({
+                            "payment_blacklisted": blacklist_result['payment_blacklisted'],
+                            "provider_blacklisted": blacklist_result['provider_blacklisted'],
+                            "blacklist_warning": blacklist_result['blacklist_warning'],
+                            "auto_associated": blacklist_result['auto_associated'],
+                            "payment_whitelisted": blacklist_result['payment_whitelisted'],
+                            "provider_whitelisted": blacklist_result['provider_whitelisted'],
+                            "pair_whitelisted": blacklist_result['pair_whitelisted'],
+                            "whitelist_notice": blacklist_result['whitelist_notice']
+                        })
+                        
+                        return result
+                    
+                    # 统计不达标，TTL内其他代理交易匹配到该收款地址时直接跳过
+                    self._negative_receiver_cache[trx_receiver] = True
             
             return None
             
@@ -635,37 +814,46 @@ class TronEnergyFinder:
             logger.error(f"分析地址时出错: {e}")
             return None
 
+    def _write_results_sync(self, addresses: List[Dict]) -> int:
+        """将新记录追加到当天的结果文件（NDJSON，每行一条；阻塞IO，在线程中执行），返回新增记录数"""
+        # 同一次保存只取一次当前时间，文件名与记录时间共用
+        now = datetime.now()
+        result_file = self._get_result_file(now)
+        if result_file != self._seen_file:
+            self._seen_proxy_hashes = self._load_seen_proxy_hashes(result_file)
+            self._seen_file = result_file
+        
+        # 只追加未记录过的代理哈希
+        current_time = now.strftime("%Y-%m-%d %H:%M:%S")
+        lines = []
+        for addr in addresses:
+            if addr["proxy_tx_hash"] not in self._seen_proxy_hashes:
+                addr["found_time"] = current_time
+                lines.append(_json_dump_line(addr))
+                self._seen_proxy_hashes.add(addr["proxy_tx_hash"])
+        
+        if lines:
+            with open(result_file, "ab+") as f:
+                # 上次写入若中途中断留下不完整的行，先补换行，避免与新记录粘连（读取时会跳过该行）
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                f.write(b"".join(lines))
+        
+        return len(lines)
+
     async def _save_results(self, addresses: List[Dict]):
         """保存结果到文件"""
         if not addresses:
             return
             
         try:
-            # 加载当天的结果文件
-            results = self._load_existing_results()
-            
-            # 获取已存在的代理哈希集合
-            existing_proxy_hashes = {record["proxy_tx_hash"] for record in results["records"]}
-            
-            # 添加新记录
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            new_records = []
-            for addr in addresses:
-                if addr["proxy_tx_hash"] not in existing_proxy_hashes:
-                    addr["found_time"] = current_time
-                    new_records.append(addr)
-                    existing_proxy_hashes.add(addr["proxy_tx_hash"])
-            
-            if new_records:
-                # 将新记录放在最前面
-                results["records"] = new_records + results["records"]
-                
-                # 保存到文件
-                result_file = self._get_result_file()
-                with open(result_file, "w", encoding="utf-8") as f:
-                    json.dump(results, f, ensure_ascii=False, indent=2)
-                
-                logger.info(f"已保存 {len(new_records)} 个新记录到文件: {result_file}")
+            # 文件读写放到线程中执行，避免阻塞事件循环
+            new_count = await asyncio.to_thread(self._write_results_sync, addresses)
+            
+            if new_count:
+                logger.info(f"已保存 {new_count} 个新记录到文件: {self._seen_file}")
             else:
                 logger.info("没有新的记录需要保存")
             
@@ -707,20 +895,73 @@ class TronEnergyFinder:
 """
         logger.info(result_text)
 
+    @staticmethod
+    def _filter_proxy_transactions(transactions: List[Dict]) -> List[Dict]:
+        """从一页区块交易中筛选能量代理交易"""
+        proxy_transactions = []
+        for tx in transactions:
+            # 只检查代理资源交易 (Type 57)；区块中绝大多数交易在这里就被跳过，
+            # 不再为它们读取 contractData
+            if tx.get("contractType") != 57:
+                continue
+            contract_data = tx.get("contractData") or _EMPTY_DICT
+            
+            # 检查是否是能量代理
+            if (contract_data.get("resource") == "ENERGY" and 
+                "balance" in contract_data and 
+                "receiver_address" in contract_data and 
+                "owner_address" in contract_data):
+                
+                proxy_transactions.append(tx)
+                # 逐笔明细只在 DEBUG 级别输出（每个区块的汇总仍为 INFO）
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "找到代理资源交易:\n交易哈希: %s\n发送人: %s\n接收人: %s\n代理数量: %s 能量",
+                        tx.get('hash'),
+                        contract_data['owner_address'],
+                        contract_data['receiver_address'],
+                        f"{contract_data['balance'] * _ENERGY_PER_SUN:,.2f}",
+                    )
+        return proxy_transactions
+
+    async def _fetch_block_page(self, url: str, block_number: int, start: int,
+                                limit: int) -> Tuple[int, List[Dict]]:
+        """获取区块交易的一页并立即筛选（失败重试由 _make_request 处理）
+        
+        返回 (本页交易条数, 本页的能量代理交易)，原始交易不在内存中保留
+        """
+        response = await self._make_request(url, {
+            "block": str(block_number),
+            "limit": str(limit),
+            "start": str(start)
+        })
+        if response and "data" in response:
+            page = response["data"]
+            return len(page), self._filter_proxy_transactions(page)
+        logger.warning(f"获取区块 {block_number} 交易失败（start={start}）")
+        return 0, []
+
     async def get_block_transactions(self, block_number: int) -> List[Dict]:
-        """获取区块交易详情"""
+        """获取区块中的能量代理交易
+        
+        只返回 contractType 为 57、resource 为 ENERGY 且带有 balance/owner_address/receiver_address
+        的交易，调用方无需再次筛选
+        """
         try:
             cache_key = f"block_{block_number}"
             
             # 检查缓存
             if cache_key in self._block_cache:
-                logger.debug(f"使用缓存的区块 {block_number} 交易数据")
+                logger.debug("使用缓存的区块 %s 交易数据", block_number)
                 return self._block_cache[cache_key]
             
-            # 使用 TronScan API 获取交易信息
-            response = await self._make_request(f"{self.tronscan_api}/transaction", {
+            url = self._transaction_url
+            limit = 200  # 每页获取200条
+            
+            # 首页请求同时返回交易总数
+            response = await self._make_request(url, {
                 "block": str(block_number),
-                "limit": "1",
+                "limit": str(limit),
                 "start": "0",
                 "count": "true"
             })
@@ -731,64 +972,30 @@ class TronEnergyFinder:
             total_transactions = response.get("total", 0)
             logger.info(f"正在检查区块 {block_number}，总交易数: {total_transactions}")
             
-            # 分批获取所有交易
-            all_transactions = []
-            start = 0
-            limit = 200  # 每次获取200条
+            # 每页到达后立即筛选，只保留代理交易；其余分页并发获取
+            # （并发与速率由信号量和 API Key 限速控制），按页序合并
+            first_page = response.get("data", [])
+            fetched_count = len(first_page)
+            proxy_transactions = self._filter_proxy_transactions(first_page)
             
-            while start < total_transactions:
-                # 添加请求延迟
-                await asyncio.sleep(0.5)  # 避免请求过快
-                
-                response = await self._make_request(f"{self.tronscan_api}/transaction", {
-                    "block": str(block_number),
-                    "limit": str(limit),
-                    "start": str(start),
-                    "count": "true"
-                })
-                
-                if not response or "data" not in response:
-                    # 如果请求失败，重试当前批次
-                    logger.warning(f"获取区块 {block_number} 交易失败，重试中...")
-                    await asyncio.sleep(1)  # 等待1秒后重试
-                    continue
-                    
-                transactions = response.get("data", [])
-                if not transactions:
-                    break
-                    
-                all_transactions.extend(transactions)
-                start += len(transactions)
-                logger.info(f"已获取 {len(all_transactions)}/{total_transactions} 条交易记录")
-            
-            # 筛选代理资源交易
-            proxy_transactions = []
-            for tx in all_transactions:
-                # 检查合约类型和描述
-                contract_type = tx.get("contractType")
-                contract_data = tx.get("contractData", {})
-                
-                # 只检查代理资源交易 (Type 57)
-                if contract_type == 57:
-                    # 检查是否是能量代理
-                    if (contract_data.get("resource") == "ENERGY" and 
-                        "balance" in contract_data and 
-                        "receiver_address" in contract_data and 
-                        "owner_address" in contract_data):
-                        
-                        proxy_transactions.append(tx)
-                        logger.info(f"找到代理资源交易:\n"
-                                  f"交易哈希: {tx.get('hash')}\n"
-                                  f"发送人: {contract_data.get('owner_address')}\n"
-                                  f"接收人: {contract_data.get('receiver_address')}\n"
-                                  f"代理数量: {contract_data.get('balance', 0) / 1_000_000 * 11.3661:,.2f} 能量")
+            offsets = range(limit, total_transactions, limit)
+            pages = await asyncio.gather(
+                *(self._fetch_block_page(url, block_number, offset, limit) for offset in offsets)
+            )
+            for page_count, page_proxies in pages:
+                fetched_count += page_count
+                proxy_transactions.extend(page_proxies)
+            logger.info(f"已获取 {fetched_count}/{total_transactions} 条交易记录")
             
             if proxy_transactions:
                 logger.info(f"区块 {block_number} 找到 {len(proxy_transactions)} 笔代理资源交易")
-                # 缓存结果
-                self._block_cache[cache_key] = proxy_transactions
             else:
                 logger.info(f"区块 {block_number} 未找到代理资源交易记录")
+            
+            # 区块内容不会变化：只缓存完整获取的结果（包括没有代理交易的区块），
+            # 提前中断的不完整结果不缓存，避免在TTL内覆盖正确数据
+            if fetched_count >= total_transactions:
+                self._block_cache[cache_key] = proxy_transactions
                 
             return proxy_transactions
             
@@ -796,15 +1003,37 @@ class TronEnergyFinder:
             logger.error(f"获取区块交易详情失败: {e}")
             return []
 
+    def clear_results_cache(self) -> None:
+        """清空查找结果缓存，下次查询将重新扫描区块"""
+        self._results_cache.clear()
+        self._empty_results_cache.clear()
+
+    def _get_cached_results(self, cache_key: str) -> Optional[List[Dict]]:
+        """读取缓存的查找结果（先查有结果的缓存，再查空结果缓存）"""
+        for cache in (self._results_cache, self._empty_results_cache):
+            if cache_key in cache:
+                logger.info("使用缓存的结果")
+                return cache[cache_key]
+        return None
+
     async def find_low_cost_energy_addresses(self):
         """查找低成本能量代理地址（带缓存和并发控制）"""
         cache_key = "latest_results"
         
         # 检查缓存
-        if cache_key in self._results_cache:
-            logger.info("使用缓存的结果")
-            return self._results_cache[cache_key]
-            
+        cached = self._get_cached_results(cache_key)
+        if cached is not None:
+            return cached
+
+        async with self._search_lock:
+            # 等待期间其他请求可能已完成查找并写入缓存
+            cached = self._get_cached_results(cache_key)
+            if cached is not None:
+                return cached
+            return await self._search_low_cost_energy_addresses(cache_key)
+
+    async def _search_low_cost_energy_addresses(self, cache_key: str):
+        """扫描最新区块查找低成本能量代理地址，并写入结果缓存"""
         try:
             # 获取最新区块
             latest_block = await self.get_latest_block()
@@ -814,65 +1043,81 @@ class TronEnergyFinder:
                 
             logger.info(f"最新区块号: {latest_block}")
             
-            # 初始化结果列表和计数器
-            found_addresses = []
-            current_block = latest_block
             max_blocks_to_check = 3  # 最多检查3个区块
-            blocks_checked = 0
             
-            # 清空缓存
-            async with self._cache_lock:
-                self._analyzed_addresses.clear()
-                self._energy_amount_cache.clear()
-                self._transaction_info_cache.clear()
+            # 重置本次查找的已分析地址（交易缓存按TTL自动过期，跨查找保留）；
+            # 查找已由 _search_lock 串行化，无需额外加锁
+            self._analyzed_addresses.clear()
             
-            while blocks_checked < max_blocks_to_check:
-                logger.info(f"正在检查区块 {current_block}...")
-                
-                transactions = await self.get_block_transactions(current_block)
-                if not transactions:
-                    logger.warning(f"区块 {current_block} 没有交易")
-                    current_block -= 1
-                    blocks_checked += 1
-                    continue
+            # 从最新区块开始依次获取交易，接收地址按区块从新到旧排队分析；
+            # 最多同时分析 MAX_CONCURRENT_ANALYSES 个地址，待分析队列取空后才预取下一个区块，
+            # 找到符合条件的地址时仅有少量已发出的请求被浪费
+            block_numbers = [latest_block - i for i in range(max_blocks_to_check)]
+            next_block_index = 0
+            block_task: Optional[asyncio.Task] = None
+            block_number = None
+            receiver_queue = deque()
+            scheduled_receivers = set()  # 同一接收地址可能出现在多笔代理交易中，只分析一次
+            analysis_tasks = set()
+            found_addresses = []
+            try:
+                while True:
+                    while receiver_queue and len(analysis_tasks) < self.MAX_CONCURRENT_ANALYSES:
+                        analysis_tasks.add(asyncio.create_task(self.analyze_address(receiver_queue.popleft())))
+                    if block_task is None and not receiver_queue and next_block_index < len(block_numbers):
+                        block_number = block_numbers[next_block_index]
+                        next_block_index += 1
+                        block_task = asyncio.create_task(self.get_block_transactions(block_number))
                     
-                logger.info(f"区块 {current_block} 有 {len(transactions)} 笔交易")
-                proxy_count = 0
-                
-                # 分析每个代理交易
-                for tx in transactions:
-                    contract_data = tx.get("contractData", {})
-                    if (tx.get("contractType") == 57 and 
-                        contract_data.get("resource") == "ENERGY"):
-                        
-                        proxy_count += 1
-                        logger.info(f"找到代理资源交易:\n"
-                                  f"交易哈希: {tx.get('hash')}\n"
-                                  f"发送人: {contract_data.get('owner_address')}\n"
-                                  f"接收人: {contract_data.get('receiver_address')}\n"
-                                  f"代理数量: {contract_data.get('balance', 0) / 1_000_000 * 11.3661:,.2f} 能量")
-                        
-                        receiver_address = contract_data.get("receiver_address")
-                        if receiver_address:
-                            address_info = await self.analyze_address(receiver_address)
+                    pending = (analysis_tasks | {block_task}) if block_task else set(analysis_tasks)
+                    if not pending:
+                        break
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    
+                    for task in done:
+                        if task is not block_task:
+                            # 接收地址分析完成，任一地址符合条件即停止并取消其余任务
+                            analysis_tasks.discard(task)
+                            address_info = task.result()
                             if address_info:
-                                # 找到符合条件的地址，保存到缓存并返回
                                 found_addresses.append(address_info)
-                                self._results_cache[cache_key] = found_addresses
-                                await self._save_results(found_addresses)
-                                await self._print_results(found_addresses)
-                                logger.info("✅ 已找到符合条件的地址，停止查找")
-                                return found_addresses
-                
-                logger.info(f"区块 {current_block} 检查完成，找到 {proxy_count} 笔代理资源交易")
-                current_block -= 1
-                blocks_checked += 1
-                
-            if not found_addresses:
-                logger.warning(f"检查了 {blocks_checked} 个区块后仍未找到符合条件的地址")
-                # 缓存空结果，避免频繁查询
+                                break
+                            continue
+                        
+                        block_task = None
+                        transactions = task.result()
+                        if not transactions:
+                            logger.warning(f"区块 {block_number} 没有代理资源交易")
+                            continue
+                        
+                        # get_block_transactions 已筛选出能量代理交易
+                        for tx in transactions:
+                            receiver_address = (tx.get("contractData") or _EMPTY_DICT).get("receiver_address")
+                            if receiver_address and receiver_address not in scheduled_receivers:
+                                scheduled_receivers.add(receiver_address)
+                                receiver_queue.append(receiver_address)
+                        
+                        logger.info(f"区块 {block_number} 检查完成，找到 {len(transactions)} 笔代理资源交易")
+                    
+                    if found_addresses:
+                        break
+            finally:
+                pending = (analysis_tasks | {block_task}) if block_task else set(analysis_tasks)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            
+            if found_addresses:
+                # 找到符合条件的地址，保存到缓存并返回
                 self._results_cache[cache_key] = found_addresses
+                await self._save_results(found_addresses)
+                await self._print_results(found_addresses)
+                logger.info("✅ 已找到符合条件的地址，停止查找")
+                return found_addresses
             
+            logger.warning(f"检查了 {len(block_numbers)} 个区块后仍未找到符合条件的地址")
+            # 短时间缓存空结果，避免频繁查询
+            self._empty_results_cache[cache_key] = found_addresses
             return found_addresses
             
         except Exception as e:
@@ -882,8 +1127,8 @@ class TronEnergyFinder:
 async def main():
     """主函数"""
     try:
-        finder = TronEnergyFinder()
-        await finder.find_low_cost_energy_addresses()
+        async with TronEnergyFinder() as finder:
+            await finder.find_low_cost_energy_addresses()
         
     except Exception as e:
         logger.error(f"运行出错: {e}")
@@ -11,18 +11,23 @@
 选项：
     --detailed        显示详细信息
     --export         导出数据到CSV文件
+    --exact          精确统计关联记录总数（默认按表统计信息估算）
 """
 
 import asyncio
 import asyncpg
 import argparse
-import csv
 import os
 import sys
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Set
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # 加载环境变量
 load_dotenv()
 
@@ -42,7 +47,7 @@ class AssociationVerifier:
             self._connection_pool = await asyncpg.create_pool(
                 self.database_url,
                 min_size=1,
-                max_size=5,
+                max_size=8,
                 command_timeout=30
             )
             print("✅ 数据库连接成功")
@@ -64,64 +69,95 @@ class AssociationVerifier:
             )
             return result
             
-    async def get_comprehensive_stats(self) -> Dict:
-        """获取全面的数据统计"""
+    async def _get_existing_tables(self, conn, table_names: List[str]) -> Set[str]:
+        """一次查询返回给定表中实际存在的表名"""
+        rows = await conn.fetch(
+            """
+            SELECT table_name FROM information_schema.tables
+            WHERE table_name = ANY($1::text[])
+            """,
+            table_names
+        )
+        return {row['table_name'] for row in rows}
+            
+    async def _fetch_stats_row(self, sql: str) -> Dict:
+        """在独立连接上执行一条统计查询，返回单行结果"""
+        async with self._connection_pool.acquire() as conn:
+            row = await conn.fetchrow(sql)
+            return dict(row)
+            
+    async def get_comprehensive_stats(self, exact: bool = False) -> Dict:
+        """获取全面的数据统计
+
+        exact 为 False 时，关联记录总数使用 pg_class.reltuples 估算（无需全表扫描）；
+        带条件的黑白名单计数无法估算，始终精确统计。
+        """
         stats = {}
         
         async with self._connection_pool.acquire() as conn:
-            # 检查表是否存在
+            # 检查表是否存在（一次查询完成）
             tables = ['blacklist', 'blacklist_associations', 'whitelist', 'whitelist_pairs', 'bot_settings']
-            for table in tables:
-                exists = await self.check_table_exists(table)
-                stats[f'{table}_exists'] = exists
-                
-            # 如果表存在，获取统计信息
-            if stats.get('blacklist_exists'):
-                # 黑名单统计
-                stats['blacklist_total'] = await conn.fetchval(
-                    "SELECT COUNT(*) FROM blacklist WHERE is_active = true"
-                )
-                stats['blacklist_manual'] = await conn.fetchval(
-                    "SELECT COUNT(*) FROM blacklist WHERE type = 'manual' AND is_active = true"
-                )
-                stats['blacklist_auto'] = await conn.fetchval(
-                    "SELECT COUNT(*) FROM blacklist WHERE type = 'auto_associated' AND is_active = true"
-                )
-                stats['blacklist_provisional'] = await conn.fetchval(
-                    "SELECT COUNT(*) FROM blacklist WHERE is_provisional = true AND is_active = true"
-                )
-                
-            if stats.get('blacklist_associations_exists'):
-                # 关联记录统计
-                stats['associations_total'] = await conn.fetchval(
-                    "SELECT COUNT(*) FROM blacklist_associations"
-                )
-                
-            if stats.get('whitelist_exists'):
-                # 白名单统计
-                stats['whitelist_addresses'] = await conn.fetchval(
-                    "SELECT COUNT(*) FROM whitelist WHERE is_active = true"
-                )
-                stats['whitelist_payment'] = await conn.fetchval(
-                    "SELECT COUNT(*) FROM whitelist WHERE address_type = 'payment' AND is_active = true"
-                )
-                stats['whitelist_provider'] = await conn.fetchval(
-                    "SELECT COUNT(*) FROM whitelist WHERE address_type = 'provider' AND is_active = true"
-                )
-                
-            if stats.get('whitelist_pairs_exists'):
-                # 白名单组合统计
-                stats['whitelist_pairs'] = await conn.fetchval(
-                    "SELECT COUNT(*) FROM whitelist_pairs WHERE is_active = true"
-                )
-                
-            if stats.get('bot_settings_exists'):
-                # 设置状态
-                association_enabled = await conn.fetchval(
-                    "SELECT value FROM bot_settings WHERE key = 'blacklist_association_enabled'"
+            existing = await self._get_existing_tables(conn, tables)
+        for table in tables:
+            stats[f'{table}_exists'] = table in existing
+            
+        # 如果表存在，获取统计信息；每张表用 FILTER 聚合只扫描一次，
+        # 各表查询分别占用连接并发执行，列别名即统计键名
+        queries = []
+        if stats.get('blacklist_exists'):
+            # 黑名单统计
+            queries.append(
+                """
+                SELECT
+                    COUNT(*) FILTER (WHERE is_active = true) AS blacklist_total,
+                    COUNT(*) FILTER (WHERE type = 'manual' AND is_active = true) AS blacklist_manual,
+                    COUNT(*) FILTER (WHERE type = 'auto_associated' AND is_active = true) AS blacklist_auto,
+                    COUNT(*) FILTER (WHERE is_provisional = true AND is_active = true) AS blacklist_provisional
+                FROM blacklist
+                """
+            )
+            
+        if stats.get('blacklist_associations_exists'):
+            # 关联记录统计
+            if exact:
+                queries.append("SELECT COUNT(*) AS associations_total FROM blacklist_associations")
+            else:
+                # 表从未 ANALYZE 时 reltuples 为 -1，此时退回精确计数
+                queries.append(
+                    """
+                    SELECT COALESCE(
+                        NULLIF((SELECT reltuples::bigint FROM pg_class
+                                WHERE oid = 'blacklist_associations'::regclass), -1),
+                        (SELECT COUNT(*) FROM blacklist_associations)
+                    ) AS associations_total
+                    """
                 )
-                stats['association_enabled'] = association_enabled
-                
+            
+        if stats.get('whitelist_exists'):
+            # 白名单统计
+            queries.append(
+                """
+                SELECT
+                    COUNT(*) FILTER (WHERE is_active = true) AS whitelist_addresses,
+                    COUNT(*) FILTER (WHERE address_type = 'payment' AND is_active = true) AS whitelist_payment,
+                    COUNT(*) FILTER (WHERE address_type = 'provider' AND is_active = true) AS whitelist_provider
+                FROM whitelist
+                """
+            )
+            
+        if stats.get('whitelist_pairs_exists'):
+            # 白名单组合统计
+            queries.append("SELECT COUNT(*) FILTER (WHERE is_active = true) AS whitelist_pairs FROM whitelist_pairs")
+            
+        if stats.get('bot_settings_exists'):
+            # 设置状态（无记录时为 NULL，与单独查询时一致）
+            queries.append(
+                "SELECT (SELECT value FROM bot_settings WHERE key = 'blacklist_association_enabled') AS association_enabled"
+            )
+            
+        for row in await asyncio.gather(*(self._fetch_stats_row(sql) for sql in queries)):
+            stats.update(row)
+            
         return stats
         
     async def get_recent_associations(self, limit: int = 10) -> List[Dict]:
@@ -159,61 +195,56 @@ class AssociationVerifier:
             )
             return [dict(row) for row in rows]
             
+    async def _export_query(self, sql: str, filename: str):
+        """用 COPY ... TO STDOUT 由数据库直接生成CSV并写入文件（asyncpg 在线程中写文件）"""
+        async with self._connection_pool.acquire() as conn:
+            await conn.copy_from_query(sql, output=filename, format='csv', header=True)
+            
+    async def _export_table(self, table_name: str, sql: str, filename: str) -> Optional[str]:
+        """表存在时导出到CSV，返回文件名；表不存在返回 None"""
+        if not await self.check_table_exists(table_name):
+            return None
+        await self._export_query(sql, filename)
+        return filename
+            
     async def export_to_csv(self, output_dir: str = "exports") -> List[str]:
         """导出数据到CSV文件"""
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
             
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        exported_files = []
         
-        # 导出黑名单
-        if await self.check_table_exists('blacklist'):
-            filename = f"{output_dir}/blacklist_{timestamp}.csv"
-            async with self._connection_pool.acquire() as conn:
-                rows = await conn.fetch(
-                    "SELECT * FROM blacklist WHERE is_active = true ORDER BY added_at DESC"
-                )
-                
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                if rows:
-                    writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                    writer.writeheader()
-                    for row in rows:
-                        writer.writerow(dict(row))
-            exported_files.append(filename)
-            
-        # 导出关联记录
-        if await self.check_table_exists('blacklist_associations'):
-            filename = f"{output_dir}/associations_{timestamp}.csv"
-            async with self._connection_pool.acquire() as conn:
-                rows = await conn.fetch(
-                    "SELECT * FROM blacklist_associations ORDER BY created_at DESC"
-                )
-                
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                if rows:
-                    writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                    writer.writeheader()
-                    for row in rows:
-                        writer.writerow(dict(row))
-            exported_files.append(filename)
-            
-        # 导出白名单
-        if await self.check_table_exists('whitelist'):
-            filename = f"{output_dir}/whitelist_{timestamp}.csv"
-            async with self._connection_pool.acquire() as conn:
-                rows = await conn.fetch(
-                    "SELECT * FROM whitelist WHERE is_active = true ORDER BY added_at DESC"
-                )
-                
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                if rows:
-                    writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-                    writer.writeheader()
-                    for row in rows:
-                        writer.writerow(dict(row))
-            exported_files.append(filename)
+        # 三张表分别占用连接池中的连接并发导出
+        results = await asyncio.gather(
+            # 导出黑名单
+            self._export_table(
+                'blacklist',
+                """
+                SELECT id, address, reason, type, added_by, added_at, is_active, is_provisional
+                FROM blacklist WHERE is_active = true ORDER BY added_at DESC
+                """,
+                f"{output_dir}/blacklist_{timestamp}.csv"
+            ),
+            # 导出关联记录
+            self._export_table(
+                'blacklist_associations',
+                """
+                SELECT id, source_address, target_address, created_at
+                FROM blacklist_associations ORDER BY created_at DESC
+                """,
+                f"{output_dir}/associations_{timestamp}.csv"
+            ),
+            # 导出白名单
+            self._export_table(
+                'whitelist',
+                """
+                SELECT id, address, address_type, reason, added_by, added_at, is_active, is_provisional, success_count
+                FROM whitelist WHERE is_active = true ORDER BY added_at DESC
+                """,
+                f"{output_dir}/whitelist_{timestamp}.csv"
+            ),
+        )
+        exported_files = [filename for filename in results if filename]
             
         return exported_files
         
@@ -228,6 +259,7 @@ async def main():
     parser = argparse.ArgumentParser(description="验证地址关联数据状态脚本")
     parser.add_argument("--detailed", action="store_true", help="显示详细信息")
     parser.add_argument("--export", action="store_true", help="导出数据到CSV文件")
+    parser.add_argument("--exact", action="store_true", help="精确统计关联记录总数（默认估算）")
     
     args = parser.parse_args()
     
@@ -239,7 +271,7 @@ async def main():
         print("=" * 50)
         
         # 获取统计信息
-        stats = await verifier.get_comprehensive_stats()
+        stats = await verifier.get_comprehensive_stats(exact=args.exact)
         
         # 显示表存在状态
         print("\n🗄️  数据表状态:")
@@ -269,7 +301,8 @@ async def main():
             
         # 关联记录
         if stats.get('blacklist_associations_exists'):
-            print(f"   关联记录: {stats.get('associations_total', 0)}")
+            approx = "" if args.exact else "（估算，--exact 精确统计）"
+            print(f"   关联记录: {stats.get('associations_total', 0)}{approx}")
         else:
             print("   关联记录: 表不存在")
             
@@ -340,4 +373,7 @@ async def main():
 
 
 if __name__ == "__main__":
+    # 安装 uvloop 以加快 asyncpg 的网络读写（未安装时使用默认事件循环）
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(main())
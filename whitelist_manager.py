@@ -1,13 +1,40 @@
+import asyncio
 import asyncpg
 import logging
 import os
-from typing import Dict, Optional
+import re
+from typing import Dict, Iterable, Optional, Tuple
 from cachetools import TTLCache
 from dotenv import load_dotenv
 
 
 logger = logging.getLogger(__name__)
 
+_TRON_ADDR_RE = re.compile(r'T[1-9A-HJ-NP-Za-km-z]{33}')
+
+_UPSERT_ADDRESS_SQL = """
+    INSERT INTO whitelist (address, address_type, reason, added_by, is_provisional)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (address, address_type)
+    DO UPDATE SET
+        reason = COALESCE(EXCLUDED.reason, whitelist.reason),
+        is_active = true,
+        is_provisional = EXCLUDED.is_provisional,
+        success_count = whitelist.success_count + 1,
+        added_at = NOW()
+"""
+
+_UPSERT_PAIR_SQL = """
+    INSERT INTO whitelist_pairs (payment_address, provider_address, is_provisional, added_by)
+    VALUES ($1, $2, $3, $4)
+    ON CONFLICT (payment_address, provider_address)
+    DO UPDATE SET
+        is_active = true,
+        is_provisional = EXCLUDED.is_provisional,
+        success_count = whitelist_pairs.success_count + 1,
+        last_success_time = NOW()
+"""
+
 
 class WhitelistManager:
     """白名单管理器
@@ -22,20 +49,40 @@ class WhitelistManager:
         if not self.database_url:
             raise ValueError("请在.env文件中设置DATABASE_URL")
         self._connection_pool: Optional[asyncpg.pool.Pool] = None
+        self._init_lock = asyncio.Lock()
+        self._ready = False
         self._cache = TTLCache(maxsize=2000, ttl=300)
+        # 组合查询缓存，与地址缓存相同，命中与未命中结果都缓存
+        self._pair_cache = TTLCache(maxsize=4000, ttl=300)
+
+    async def ensure_ready(self) -> None:
+        """确保数据库已初始化（幂等，并发调用时只初始化一次）"""
+        if self._ready:
+            return
+        async with self._init_lock:
+            if not self._ready:
+                await self.init_database()
 
     async def init_database(self) -> None:
-        self._connection_pool = await asyncpg.create_pool(
+        # asyncpg 会按连接缓存预处理语句（默认100条），热点的 upsert/查询无需手动 prepare
+        pool = await asyncpg.create_pool(
             self.database_url,
-            min_size=1,
-            max_size=10,
+            min_size=2,
+            max_size=20,
+            max_inactive_connection_lifetime=300,
             command_timeout=30,
         )
-        await self._create_tables()
+        # 建表失败时关闭本次创建的连接池，避免下次重试时遗留旧连接池
+        try:
+            await self._create_tables(pool)
+        except Exception:
+            await pool.close()
+            raise
+        self._connection_pool = pool
+        self._ready = True
 
-    async def _create_tables(self) -> None:
-        assert self._connection_pool is not None
-        async with self._connection_pool.acquire() as conn:
+    async def _create_tables(self, pool: asyncpg.pool.Pool) -> None:
+        async with pool.acquire() as conn:
             # 单地址白名单
             await conn.execute(
                 """
@@ -56,9 +103,9 @@ class WhitelistManager:
             await conn.execute(
                 "CREATE INDEX IF NOT EXISTS idx_whitelist_address ON whitelist(address)"
             )
-            await conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_whitelist_active ON whitelist(is_active)"
-            )
+            # 按地址查询由 UNIQUE(address, address_type) 索引直接定位唯一一行，
+            # 布尔列 is_active 上的单列索引选择性太低，查询用不到，只会增加写入开销
+            await conn.execute("DROP INDEX IF EXISTS idx_whitelist_active")
 
             # 组合白名单
             await conn.execute(
@@ -89,22 +136,10 @@ class WhitelistManager:
             return False
         if address_type not in ("payment", "provider"):
             return False
-        if self._connection_pool is None:
-            await self.init_database()
-        assert self._connection_pool is not None
+        await self.ensure_ready()
         async with self._connection_pool.acquire() as conn:
             await conn.execute(
-                """
-                INSERT INTO whitelist (address, address_type, reason, added_by, is_provisional)
-                VALUES ($1, $2, $3, $4, $5)
-                ON CONFLICT (address, address_type)
-                DO UPDATE SET
-                    reason = COALESCE(EXCLUDED.reason, whitelist.reason),
-                    is_active = true,
-                    is_provisional = EXCLUDED.is_provisional,
-                    success_count = whitelist.success_count + 1,
-                    added_at = NOW()
-                """,
+                _UPSERT_ADDRESS_SQL,
                 address,
                 address_type,
                 reason,
@@ -115,10 +150,27 @@ class WhitelistManager:
         self._cache.pop((address, address_type), None)
         return True
 
+    async def add_addresses(self, rows: Iterable[Tuple[str, str, Optional[str], Optional[int], bool]]) -> int:
+        """批量加入白名单，rows 为 (address, address_type, reason, added_by, is_provisional)，返回写入条数
+
+        使用 executemany 在同一事务内流水线执行 upsert；格式不合法的行会被跳过。
+        """
+        valid_rows = [
+            row for row in rows
+            if self._validate_tron_address(row[0]) and row[1] in ("payment", "provider")
+        ]
+        if not valid_rows:
+            return 0
+        await self.ensure_ready()
+        async with self._connection_pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(_UPSERT_ADDRESS_SQL, valid_rows)
+        for row in valid_rows:
+            self._cache.pop((row[0], row[1]), None)
+        return len(valid_rows)
+
     async def remove_address(self, address: str, address_type: str) -> bool:
-        if self._connection_pool is None:
-            await self.init_database()
-        assert self._connection_pool is not None
+        await self.ensure_ready()
         async with self._connection_pool.acquire() as conn:
             await conn.execute(
                 "UPDATE whitelist SET is_active = false WHERE address = $1 AND address_type = $2",
@@ -129,12 +181,13 @@ class WhitelistManager:
         return True
 
     async def check_address(self, address: str, address_type: str) -> Optional[Dict]:
+        # 格式不合法的地址不可能在白名单中，不占用连接池
+        if not self._validate_tron_address(address):
+            return None
         cache_key = (address, address_type)
         if cache_key in self._cache:
             return self._cache[cache_key]
-        if self._connection_pool is None:
-            await self.init_database()
-        assert self._connection_pool is not None
+        await self.ensure_ready()
         async with self._connection_pool.acquire() as conn:
             row = await conn.fetchrow(
                 """
@@ -155,33 +208,69 @@ class WhitelistManager:
     async def add_pair(self, payment_address: str, provider_address: str, added_by: Optional[int], is_provisional: bool = True) -> bool:
         if not (self._validate_tron_address(payment_address) and self._validate_tron_address(provider_address)):
             return False
-        if self._connection_pool is None:
-            await self.init_database()
-        assert self._connection_pool is not None
+        await self.ensure_ready()
         async with self._connection_pool.acquire() as conn:
             await conn.execute(
-                """
-                INSERT INTO whitelist_pairs (payment_address, provider_address, is_provisional, added_by)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (payment_address, provider_address)
-                DO UPDATE SET
-                    is_active = true,
-                    is_provisional = EXCLUDED.is_provisional,
-                    success_count = whitelist_pairs.success_count + 1,
-                    last_success_time = NOW()
-                """,
+                _UPSERT_PAIR_SQL,
                 payment_address,
                 provider_address,
                 is_provisional,
                 added_by,
             )
-        # no cache for pair currently
+        self._pair_cache.pop((payment_address, provider_address), None)
+        return True
+
+    async def add_pairs(self, rows: Iterable[Tuple[str, str, Optional[int], bool]]) -> int:
+        """批量加入组合白名单，rows 为 (payment_address, provider_address, added_by, is_provisional)，返回写入条数"""
+        valid_rows = [
+            (payment_address, provider_address, is_provisional, added_by)
+            for payment_address, provider_address, added_by, is_provisional in rows
+            if self._validate_tron_address(payment_address) and self._validate_tron_address(provider_address)
+        ]
+        if not valid_rows:
+            return 0
+        await self.ensure_ready()
+        async with self._connection_pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(_UPSERT_PAIR_SQL, valid_rows)
+        for payment_address, provider_address, _, _ in valid_rows:
+            self._pair_cache.pop((payment_address, provider_address), None)
+        return len(valid_rows)
+
+    async def record_success_vote(self, payment_address: str, provider_address: str, added_by: Optional[int], is_provisional: bool = True) -> bool:
+        """记录“已获得能量”反馈：收款地址、能量提供方及其组合在同一事务中加入白名单"""
+        if not (self._validate_tron_address(payment_address) and self._validate_tron_address(provider_address)):
+            return False
+        await self.ensure_ready()
+        reason = f"用户{added_by}反馈成功"
+        async with self._connection_pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(
+                    _UPSERT_ADDRESS_SQL,
+                    [
+                        (payment_address, "payment", reason, added_by, is_provisional),
+                        (provider_address, "provider", reason, added_by, is_provisional),
+                    ],
+                )
+                await conn.execute(
+                    _UPSERT_PAIR_SQL,
+                    payment_address,
+                    provider_address,
+                    is_provisional,
+                    added_by,
+                )
+        self._cache.pop((payment_address, "payment"), None)
+        self._cache.pop((provider_address, "provider"), None)
+        self._pair_cache.pop((payment_address, provider_address), None)
         return True
 
     async def check_pair(self, payment_address: str, provider_address: str) -> Optional[Dict]:
-        if self._connection_pool is None:
-            await self.init_database()
-        assert self._connection_pool is not None
+        if not (self._validate_tron_address(payment_address) and self._validate_tron_address(provider_address)):
+            return None
+        cache_key = (payment_address, provider_address)
+        if cache_key in self._pair_cache:
+            return self._pair_cache[cache_key]
+        await self.ensure_ready()
         async with self._connection_pool.acquire() as conn:
             row = await conn.fetchrow(
                 """
@@ -192,12 +281,12 @@ class WhitelistManager:
                 payment_address,
                 provider_address,
             )
-            return dict(row) if row else None
+            info = dict(row) if row else None
+            self._pair_cache[cache_key] = info
+            return info
 
     async def get_stats(self) -> Dict:
-        if self._connection_pool is None:
-            await self.init_database()
-        assert self._connection_pool is not None
+        await self.ensure_ready()
         async with self._connection_pool.acquire() as conn:
             row1 = await conn.fetchrow("SELECT COUNT(*) AS cnt FROM whitelist WHERE is_active = true")
             row2 = await conn.fetchrow("SELECT COUNT(*) AS cnt FROM whitelist_pairs WHERE is_active = true")
@@ -206,14 +295,9 @@ class WhitelistManager:
                 "pairs": int(row2["cnt"]) if row2 else 0,
             }
 
-    def _validate_tron_address(self, address: str) -> bool:
-        if not address:
-            return False
-        if address.startswith('T') and len(address) == 34:
-            import re
-            pattern = r'^T[1-9A-HJ-NP-Za-km-z]{33}$'
-            return bool(re.match(pattern, address))
-        return False
+    @staticmethod
+    def _validate_tron_address(address: str) -> bool:
+        return bool(address) and _TRON_ADDR_RE.fullmatch(address) is not None
 
     async def close(self) -> None:
         if self._connection_pool: